@@ -3,11 +3,63 @@ Asset management system for the pseudo-3D RPG.
 Handles loading, caching, and generation of game assets.
 """
 
-import pygame
+import functools
+import mmap
 import os
+import queue
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from enum import IntEnum
+import numpy as np
+import pygame
 from assets.texture_generator import TextureGenerator
 
+# Raw texture cache header: width, height, channels (little-endian uint32s)
+RAW_CACHE_HEADER = struct.Struct("<III")
+
+class Lighting(IntEnum):
+    """Wall texture lighting variants; the value is also the channel right-shift."""
+    NORMAL = 0
+    DARK = 1
+    VERY_DARK = 2
+
+# Variant names accepted by get_texture_variant for backwards compatibility
+LIGHTING_NAMES = {"normal": Lighting.NORMAL, "dark": Lighting.DARK, "very_dark": Lighting.VERY_DARK}
+
+# Floor and ceiling textures are wrapped with a bit mask by the Mode 7
+# renderer, so their sides must be powers of two
+MODE7_TEXTURES = ("floor", "ceiling")
+
+# Fallback sound length: 0.1 seconds of silence
+FALLBACK_SOUND_SECONDS = 0.1
+
 class AssetManager:
+    # Texture table: (target dict, key, file name, generator method, generator args, convert method)
+    _ASSET_JOBS = (
+        ("textures", 1, "stone_wall", "generate_wall_texture", ("stone_wall",), "convert"),
+        ("textures", 2, "brick_wall", "generate_wall_texture", ("brick_wall",), "convert"),
+        ("textures", 3, "wood_wall", "generate_wall_texture", ("wood_wall",), "convert"),
+        ("textures", 4, "metal_wall", "generate_wall_texture", ("metal_wall",), "convert"),
+        ("textures", "floor", "floor", "generate_floor_texture", (), "convert"),
+        ("textures", "ceiling", "ceiling", "generate_ceiling_texture", (), "convert"),
+        ("sprite_textures", "goblin_sprite", "goblin_sprite", "generate_enemy_sprite", ("goblin_sprite",), "convert_alpha"),
+        ("sprite_textures", "orc_sprite", "orc_sprite", "generate_enemy_sprite", ("orc_sprite",), "convert_alpha"),
+        ("sprite_textures", "skeleton_sprite", "skeleton_sprite", "generate_enemy_sprite", ("skeleton_sprite",), "convert_alpha"),
+        ("sprite_textures", "troll_sprite", "troll_sprite", "generate_enemy_sprite", ("troll_sprite",), "convert_alpha"),
+        ("sprite_textures", "spider_sprite", "spider_sprite", "generate_enemy_sprite", ("spider_sprite",), "convert_alpha"),
+        ("sprite_textures", "player_sprite", "player_sprite", "generate_enemy_sprite", ("player_sprite",), "convert_alpha"),
+        ("weapon_textures", "fist", "fist", "generate_weapon_texture", ("fist",), "convert_alpha"),
+        ("weapon_textures", "sword", "sword", "generate_weapon_texture", ("sword",), "convert_alpha"),
+        ("weapon_textures", "dagger", "dagger", "generate_weapon_texture", ("dagger",), "convert_alpha"),
+        ("weapon_textures", "axe", "axe", "generate_weapon_texture", ("axe",), "convert_alpha"),
+        ("weapon_textures", "spear", "spear", "generate_weapon_texture", ("spear",), "convert_alpha"),
+        ("weapon_textures", "bow", "bow", "generate_weapon_texture", ("bow",), "convert_alpha"),
+        ("weapon_textures", "wand", "wand", "generate_weapon_texture", ("wand",), "convert_alpha"),
+        ("weapon_textures", "staff", "staff", "generate_weapon_texture", ("staff",), "convert_alpha"),
+        ("weapon_textures", "shield", "shield", "generate_weapon_texture", ("shield",), "convert_alpha"),
+    )
+    
     def __init__(self):
         """Initialize the asset manager."""
         self.textures = {}
@@ -16,6 +68,39 @@ class AssetManager:
         self.sprite_textures = {}
         self.weapon_textures = {}
         
+        # get_font fallback, cached once the default fonts are loaded
+        self._medium_font = None
+        
+        # Wall textures and their lighting variants, indexed [wall id][Lighting]
+        self._wall_variants = []
+        
+        # Wall pixels in surfarray order for the wall renderer: (wall, x, y, 3),
+        # with the row of each wall id; rebuilt once a load has stored new walls
+        self._wall_atlas = None
+        self._wall_atlas_index = {}
+        self._walls_pending = False
+        
+        # Sprite mipmaps (SpriteLOD) by sprite id, built as sprites are stored
+        self._sprite_lods = {}
+        
+        # Reusable darkening buffers, keyed by texture size
+        self._darken_scratch = {}
+        
+        # Byte size of every stored texture, keyed by (dict id, key)
+        self._tex_sizes = {}
+        
+        # Shared silence for missing sounds; survives unload/reload cycles
+        self._silent_sound = None
+        
+        # Display surface used as the convert() target; fetched on first load
+        self._display_format = None
+        
+        # Background texture loading: the loader thread fills the queue and the
+        # main thread drains it (pump_assets), since convert() needs the display
+        self._io_queue = queue.Queue(maxsize=8)
+        self._loader_thread = None
+        self.ready = False
+        
         # Initialize texture generator for procedural assets
         self.texture_generator = TextureGenerator()
         
@@ -23,162 +108,312 @@ class AssetManager:
         self.texture_dir = "textures"
         self.sound_dir = "sounds"
         self.font_dir = "fonts"
+        self.cache_dir = os.path.join(self.texture_dir, ".cache")
+        self._texture_prefix = self.texture_dir + os.sep
+        self._cache_prefix = self.cache_dir + os.sep
         
         # Create directories if they don't exist
         self.ensure_directories()
     
     def ensure_directories(self):
         """Create asset directories if they don't exist."""
-        directories = [self.texture_dir, self.sound_dir, self.font_dir]
+        directories = [self.texture_dir, self.sound_dir, self.font_dir, self.cache_dir]
         for directory in directories:
             if not os.path.exists(directory):
                 os.makedirs(directory, exist_ok=True)
+        self.scan_asset_directories()
+    
+    def scan_asset_directories(self):
+        """List each asset directory once so presence checks are set lookups, not stats."""
+        self._texture_files = self._list_files(self.texture_dir)
+        self._cache_files = self._list_files(self.cache_dir)
+        self._sound_files = self._list_files(self.sound_dir)
+        self._font_files = self._list_files(self.font_dir)
+    
+    def _list_files(self, directory):
+        """Return the set of regular file names in a directory."""
+        try:
+            with os.scandir(directory) as entries:
+                return {entry.name for entry in entries if entry.is_file()}
+        except OSError:
+            return set()
     
     def load_all_assets(self):
-        """Load all game assets."""
+        """Load sounds and fonts, and start streaming textures in the background.
+        
+        Returns before the textures are ready; call pump_assets each frame (or
+        wait_for_assets) until the ready flag is set.
+        """
         print("Loading game assets...")
         
         # Load or generate textures
-        self.load_textures()
+        self.start_loading(self._ASSET_JOBS)
         
-        # Load or generate sounds
-        self.load_sounds()
-        
-        # Load fonts
-        self.load_fonts()
-        
-        print("Asset loading complete.")
+        # Mixer and font setup don't depend on the textures or each other, so
+        # they run on their own threads while the textures are being generated
+        loaders = [
+            threading.Thread(target=self.load_sounds),
+            threading.Thread(target=self.load_fonts),
+        ]
+        for loader in loaders:
+            loader.start()
+        for loader in loaders:
+            loader.join()
     
     def load_textures(self):
-        """Load or generate wall and floor textures."""
-        # Wall textures
-        wall_textures = {
-            1: "stone_wall",
-            2: "brick_wall",
-            3: "wood_wall",
-            4: "metal_wall"
-        }
+        """Load or generate wall, floor, sprite and weapon textures."""
+        self._run_asset_jobs(self._ASSET_JOBS)
+    
+    def load_sprite_textures(self):
+        """Load or generate sprite textures for enemies and items."""
+        self._run_asset_jobs(job for job in self._ASSET_JOBS if job[0] == "sprite_textures")
+    
+    def load_weapon_textures(self):
+        """Load or generate weapon textures."""
+        self._run_asset_jobs(job for job in self._ASSET_JOBS if job[0] == "weapon_textures")
+    
+    def _run_asset_jobs(self, jobs):
+        """Load or generate every texture in jobs and wait until they are stored."""
+        self.start_loading(jobs)
+        self.wait_for_assets()
+    
+    def start_loading(self, jobs):
+        """Start the loader thread on a set of texture jobs."""
+        if self._loader_thread is not None:
+            # Only one loader feeds the queue at a time
+            self.wait_for_assets()
         
-        for texture_id, texture_name in wall_textures.items():
-            texture_path = os.path.join(self.texture_dir, f"{texture_name}.png")
-            
-            if os.path.exists(texture_path):
-                # Load existing texture
-                try:
-                    texture = pygame.image.load(texture_path).convert()
-                    self.textures[texture_id] = texture
-                    print(f"Loaded texture: {texture_name}")
-                except pygame.error as e:
-                    print(f"Error loading texture {texture_name}: {e}")
-                    # Generate fallback texture
-                    self.textures[texture_id] = self.texture_generator.generate_wall_texture(texture_name)
-            else:
-                # Generate procedural texture
-                print(f"Generating texture: {texture_name}")
-                self.textures[texture_id] = self.texture_generator.generate_wall_texture(texture_name)
-                
-                # Save generated texture
-                try:
-                    pygame.image.save(self.textures[texture_id], texture_path)
-                    print(f"Saved generated texture: {texture_name}")
-                except pygame.error as e:
-                    print(f"Error saving texture {texture_name}: {e}")
+        # Build the shared wall noise once, before the workers race to create it
+        self.texture_generator.generate_wall_base()
         
-        # Floor and ceiling textures
-        floor_path = os.path.join(self.texture_dir, "floor.png")
-        if os.path.exists(floor_path):
-            try:
-                self.textures["floor"] = pygame.image.load(floor_path).convert()
-                print("Loaded floor texture")
-            except pygame.error:
-                self.textures["floor"] = self.texture_generator.generate_floor_texture()
-        else:
-            print("Generating floor texture")
-            self.textures["floor"] = self.texture_generator.generate_floor_texture()
+        self.ready = False
+        self._loader_thread = threading.Thread(target=self._io_loop, args=(tuple(jobs),), daemon=True)
+        self._loader_thread.start()
+    
+    def _io_loop(self, jobs):
+        """Loader thread: read or generate textures on a pool and queue them for the main thread."""
+        try:
+            with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+                futures = {}
+                for dict_attr, key, name, generator_method, generator_args, convert_method in jobs:
+                    generate = functools.partial(
+                        getattr(self.texture_generator, generator_method), *generator_args
+                    )
+                    future = executor.submit(self._load_one, name, generate)
+                    futures[future] = (getattr(self, dict_attr), key, convert_method)
+                
+                for future in as_completed(futures):
+                    try:
+                        surface, loaded = future.result()
+                    except Exception as e:
+                        print(f"Error loading texture: {e}")
+                        continue
+                    self._io_queue.put(futures[future] + (surface, loaded))
+        finally:
+            # Always signal the end, so the main thread never waits forever
+            self._io_queue.put(None)
+    
+    def pump_assets(self, max_items=4):
+        """Store up to max_items loaded textures; call once per frame. Returns the ready flag."""
+        for _ in range(max_items):
+            if self.ready:
+                break
             try:
-                pygame.image.save(self.textures["floor"], floor_path)
-            except pygame.error as e:
-                print(f"Error saving floor texture: {e}")
+                item = self._io_queue.get_nowait()
+            except queue.Empty:
+                break
+            self._finish_item(item)
+        return self.ready
+    
+    def wait_for_assets(self):
+        """Block until the loader thread has delivered every texture."""
+        while not self.ready:
+            self._finish_item(self._io_queue.get())
+    
+    def _load_surface(self, path):
+        """Decode an image file without converting it (safe off the main thread).
         
-        ceiling_path = os.path.join(self.texture_dir, "ceiling.png")
-        if os.path.exists(ceiling_path):
+        The file is memory-mapped and handed to pygame as a file object, so the
+        decoder reads straight from the page cache instead of a copied bytes buffer.
+        """
+        with open(path, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                # The name hint lets pygame pick the decoder without sniffing
+                return pygame.image.load(mapped, path)
+    
+    def _load_one(self, name, generate):
+        """Worker task: decode a texture from disk, or generate (and save) it.
+        
+        Returns (surface, loaded) where loaded is True if the surface came from
+        disk and still needs converting to the display format.
+        """
+        filename = f"{name}.png"
+        cache_filename = f"{name}.raw"
+        path = self._texture_prefix + filename
+        cache_path = self._cache_prefix + cache_filename
+        has_png = filename in self._texture_files
+        
+        # Raw pixel cache skips PNG decoding entirely on warm starts
+        if cache_filename in self._cache_files and self._is_cache_fresh(cache_path, path, has_png):
             try:
-                self.textures["ceiling"] = pygame.image.load(ceiling_path).convert()
-                print("Loaded ceiling texture")
-            except pygame.error:
-                self.textures["ceiling"] = self.texture_generator.generate_ceiling_texture()
-        else:
-            print("Generating ceiling texture")
-            self.textures["ceiling"] = self.texture_generator.generate_ceiling_texture()
+                surface = self._load_cached(cache_path)
+                print(f"Loaded cached texture: {name}")
+                return surface, True
+            except (OSError, ValueError, pygame.error) as e:
+                print(f"Error loading cached texture {name}: {e}")
+        
+        if has_png:
             try:
-                pygame.image.save(self.textures["ceiling"], ceiling_path)
-            except pygame.error as e:
-                print(f"Error saving ceiling texture: {e}")
+                surface = self._load_surface(path)
+                print(f"Loaded texture: {name}")
+            except (pygame.error, ValueError) as e:  # ValueError: empty file can't be mapped
+                print(f"Error loading texture {name}: {e}")
+                # Generate fallback texture
+                return generate(), False
+            
+            self._write_cache(surface, cache_path)
+            self._cache_files.add(cache_filename)
+            return surface, True
+        
+        # Generate procedural texture
+        print(f"Generating texture: {name}")
+        surface = generate()
         
-        # Load sprite textures
-        self.load_sprite_textures()
+        # Save generated texture in the background so loading isn't held up
+        saver = threading.Thread(
+            target=self._save_generated,
+            args=(surface.copy(), filename, cache_filename, name)
+        )
+        saver.start()
         
-        # Load weapon textures
-        self.load_weapon_textures()
+        return surface, False
     
-    def load_sprite_textures(self):
-        """Load or generate sprite textures for enemies and items."""
-        sprite_names = [
-            "goblin_sprite", "orc_sprite", "skeleton_sprite", 
-            "troll_sprite", "spider_sprite", "player_sprite"
-        ]
+    def _save_generated(self, surface, filename, cache_filename, name):
+        """Write a generated texture to its PNG and raw cache files."""
+        try:
+            pygame.image.save(surface, self._texture_prefix + filename)
+            self._texture_files.add(filename)
+            print(f"Saved generated texture: {name}")
+        except pygame.error as e:
+            print(f"Error saving texture {name}: {e}")
+        if self._write_cache(surface, self._cache_prefix + cache_filename):
+            self._cache_files.add(cache_filename)
+    
+    def _is_cache_fresh(self, cache_path, source_path, has_source):
+        """Check that a raw cache file exists and is not older than its PNG."""
+        try:
+            cache_mtime = os.path.getmtime(cache_path)
+        except OSError:
+            return False
+        if not has_source:
+            return True  # PNG is gone, the cache is all we have
+        try:
+            return cache_mtime >= os.path.getmtime(source_path)
+        except OSError:
+            return True  # PNG is gone, the cache is all we have
+    
+    def _load_cached(self, cache_path):
+        """Rebuild a surface from a raw cache file with a single copy."""
+        with open(cache_path, "rb") as f:
+            data = f.read()
+        width, height, channels = RAW_CACHE_HEADER.unpack_from(data)
+        pixel_format = "RGBA" if channels == 4 else "RGB"
+        pixels = data[RAW_CACHE_HEADER.size:]
+        if len(pixels) != width * height * channels:
+            raise ValueError("truncated texture cache")
+        return pygame.image.frombytes(pixels, (width, height), pixel_format)
+    
+    def _write_cache(self, surface, cache_path):
+        """Dump a surface's pixels to a raw cache file (header: width, height, channels)."""
+        has_alpha = surface.get_masks()[3] != 0
+        pixel_format = "RGBA" if has_alpha else "RGB"
+        header = RAW_CACHE_HEADER.pack(surface.get_width(), surface.get_height(), len(pixel_format))
+        temp_path = cache_path + ".tmp"
+        try:
+            with open(temp_path, "wb") as f:
+                f.write(header)
+                f.write(pygame.image.tobytes(surface, pixel_format))
+            os.replace(temp_path, cache_path)
+            return True
+        except OSError as e:
+            print(f"Error writing texture cache {cache_path}: {e}")
+            return False
+    
+    def _get_display_format(self):
+        """Return the display surface whose pixel format loaded textures convert to."""
+        if self._display_format is None:
+            self._display_format = pygame.display.get_surface()
+        return self._display_format
+    
+    def _finish_item(self, item):
+        """Convert and store one queued texture, or mark loading done on the end marker."""
+        if item is None:
+            self._loader_thread.join()
+            self._loader_thread = None
+            if self._walls_pending:
+                self._build_wall_atlas()
+            self.ready = True
+            print("Asset loading complete.")
+            return
         
-        for sprite_name in sprite_names:
-            sprite_path = os.path.join(self.texture_dir, f"{sprite_name}.png")
-            
-            if os.path.exists(sprite_path):
-                try:
-                    texture = pygame.image.load(sprite_path).convert_alpha()
-                    self.sprite_textures[sprite_name] = texture
-                    print(f"Loaded sprite: {sprite_name}")
-                except pygame.error as e:
-                    print(f"Error loading sprite {sprite_name}: {e}")
-                    # Generate fallback sprite
-                    self.sprite_textures[sprite_name] = self.texture_generator.generate_enemy_sprite(sprite_name)
-            else:
-                # Generate procedural sprite
-                print(f"Generating sprite: {sprite_name}")
-                self.sprite_textures[sprite_name] = self.texture_generator.generate_enemy_sprite(sprite_name)
-                
-                # Save generated sprite
-                try:
-                    pygame.image.save(self.sprite_textures[sprite_name], sprite_path)
-                    print(f"Saved generated sprite: {sprite_name}")
-                except pygame.error as e:
-                    print(f"Error saving sprite {sprite_name}: {e}")
+        target, key, convert_method, surface, loaded = item
+        if loaded:
+            # convert() needs the display, so it must run on the main thread
+            surface = getattr(surface, convert_method)(self._get_display_format())
+        self._store(target, key, surface)
+        if target is self.textures and isinstance(key, int):
+            self._walls_pending = True
     
-    def load_weapon_textures(self):
-        """Load or generate weapon textures."""
-        weapon_types = ["fist", "sword", "dagger", "axe", "spear", "bow", "wand", "staff", "shield"]
+    def _build_wall_atlas(self):
+        """Stack the wall textures into one (wall, x, y, 3) array; walls of another size are scaled to the first."""
+        self._walls_pending = False
+        wall_ids = sorted(key for key in self.textures if isinstance(key, int))
+        if not wall_ids:
+            self._wall_atlas = None
+            self._wall_atlas_index = {}
+            return
         
-        for weapon_type in weapon_types:
-            weapon_path = os.path.join(self.texture_dir, f"{weapon_type}.png")
-            
-            if os.path.exists(weapon_path):
-                try:
-                    texture = pygame.image.load(weapon_path).convert_alpha()
-                    self.weapon_textures[weapon_type] = texture
-                    print(f"Loaded weapon: {weapon_type}")
-                except pygame.error as e:
-                    print(f"Error loading weapon {weapon_type}: {e}")
-                    # Generate fallback weapon
-                    self.weapon_textures[weapon_type] = self.texture_generator.generate_weapon_texture(weapon_type)
+        size = self.textures[wall_ids[0]].get_size()
+        atlas = np.empty((len(wall_ids),) + size + (3,), dtype=np.uint8)
+        for row, wall_id in enumerate(wall_ids):
+            texture = self.textures[wall_id]
+            if texture.get_size() != size:
+                texture = pygame.transform.scale(texture, size)
+            atlas[row] = pygame.surfarray.array3d(texture)
+        
+        self._wall_atlas = atlas
+        self._wall_atlas_index = {wall_id: row for row, wall_id in enumerate(wall_ids)}
+    
+    def _store(self, target, key, surface):
+        """Store a texture and remember its byte size for get_memory_usage.
+        
+        A floor or ceiling texture whose sides aren't powers of two is
+        rejected, leaving the Mode 7 renderer on its default texture.
+        """
+        if target is self.textures and key in MODE7_TEXTURES:
+            width, height = surface.get_size()
+            if width & (width - 1) or height & (height - 1):
+                print(f"Rejected {key} texture: size {width}x{height} is not a power of two")
+                return
+        target[key] = surface
+        self._tex_sizes[(id(target), key)] = (
+            surface.get_width() * surface.get_height() * surface.get_bytesize()
+        )
+        if target is self.textures and isinstance(key, int):
+            # Wall textures also get a variant row; darker variants are built on demand
+            if key >= len(self._wall_variants):
+                self._wall_variants.extend([None] * (key + 1 - len(self._wall_variants)))
+            old_variants = self._wall_variants[key]
+            if old_variants is not None:
+                for variant in Lighting:
+                    self._tex_sizes.pop((id(old_variants), variant), None)
+            self._wall_variants[key] = [surface] + [None] * (len(Lighting) - 1)
+        elif target is self.sprite_textures:
+            lod = self.texture_generator.build_sprite_lod(surface)
+            if lod is None:
+                self._sprite_lods.pop(key, None)
             else:
-                # Generate procedural weapon texture
-                print(f"Generating weapon texture: {weapon_type}")
-                self.weapon_textures[weapon_type] = self.texture_generator.generate_weapon_texture(weapon_type)
-                
-                # Save generated weapon texture
-                try:
-                    pygame.image.save(self.weapon_textures[weapon_type], weapon_path)
-                    print(f"Saved generated weapon: {weapon_type}")
-                except pygame.error as e:
-                    print(f"Error saving weapon {weapon_type}: {e}")
+                self._sprite_lods[key] = lod
     
     def load_sounds(self):
         """Load or generate sound effects."""
@@ -204,10 +439,9 @@ class AssetManager:
         }
         
         for filename, sound_type in sound_files.items():
-            sound_path = os.path.join(self.sound_dir, filename)
-            
-            if os.path.exists(sound_path):
+            if filename in self._sound_files:
                 try:
+                    sound_path = os.path.join(self.sound_dir, filename)
                     sound = pygame.mixer.Sound(sound_path)
                     self.sounds[filename] = sound
                     print(f"Loaded sound: {filename}")
@@ -222,24 +456,21 @@ class AssetManager:
     
     def create_fallback_sound(self, sound_type):
         """Create a simple fallback sound effect."""
-        # Create a very short, quiet sound as fallback
+        # Every fallback is the same short silence, so share a single Sound
         # In a real implementation, you might generate procedural audio
-        try:
-            # Create 0.1 second of silence
-            sample_rate = 22050
-            duration = 0.1
-            frames = int(duration * sample_rate)
-            
-            # Create silent sound array
-            import numpy as np
-            sound_array = np.zeros((frames, 2), dtype=np.int16)
-            
-            # Convert to pygame sound
-            sound = pygame.sndarray.make_sound(sound_array)
-            return sound
-        except:
-            # If numpy/sndarray isn't available, return None
-            return None
+        if self._silent_sound is None:
+            mixer_format = pygame.mixer.get_init()
+            if mixer_format is None:
+                return None
+            # The array has to match the mixer's channel count: 1-D for mono
+            frequency, _, channels = mixer_format
+            frames = int(FALLBACK_SOUND_SECONDS * frequency)
+            shape = (frames,) if channels == 1 else (frames, channels)
+            try:
+                self._silent_sound = pygame.sndarray.make_sound(np.zeros(shape, dtype=np.int16))
+            except (pygame.error, ValueError):
+                return None  # Mixer isn't usable
+        return self._silent_sound
     
     def load_fonts(self):
         """Load game fonts."""
@@ -257,6 +488,7 @@ class AssetManager:
             self.fonts["medium"] = pygame.font.Font(None, 28)
             self.fonts["large"] = pygame.font.Font(None, 36)
             self.fonts["title"] = pygame.font.Font(None, 48)
+        self._medium_font = self.fonts["medium"]
         
         # Try to load custom fonts if they exist
         font_files = {
@@ -265,9 +497,9 @@ class AssetManager:
         }
         
         for font_name, filename in font_files.items():
-            font_path = os.path.join(self.font_dir, filename)
-            if os.path.exists(font_path):
+            if filename in self._font_files:
                 try:
+                    font_path = os.path.join(self.font_dir, filename)
                     self.fonts[font_name] = pygame.font.Font(font_path, 32)
                     print(f"Loaded custom font: {font_name}")
                 except pygame.error as e:
@@ -277,8 +509,20 @@ class AssetManager:
         """Get a wall/floor texture by ID or name."""
         return self.textures.get(texture_id)
     
-    def get_sprite_texture(self, sprite_id):
-        """Get a sprite texture by ID."""
+    def get_wall_atlas(self):
+        """Get the wall texture atlas and its {wall id: row} index, or (None, {}) before the walls load.
+        
+        The atlas is a new array after every load, so callers can cache
+        anything derived from it until the identity changes.
+        """
+        return self._wall_atlas, self._wall_atlas_index
+    
+    def get_sprite_texture(self, sprite_id, size=None):
+        """Get a sprite texture by ID, or the mipmap best suited to a size-pixel blit."""
+        if size is not None:
+            lod = self._sprite_lods.get(sprite_id)
+            if lod is not None:
+                return lod.for_size(size)
         return self.sprite_textures.get(sprite_id)
     
     def get_weapon_texture(self, weapon_type):
@@ -290,70 +534,75 @@ class AssetManager:
         return self.sounds.get(sound_name)
     
     def get_font(self, font_name):
-        """Get a font by name."""
-        return self.fonts.get(font_name, self.fonts.get("medium"))
-    
-    def preload_texture_variants(self):
-        """Preload different variants of textures for different lighting conditions."""
-        for texture_id, texture in self.textures.items():
-            if isinstance(texture_id, int):  # Wall textures
-                # Create darker variants for distance shading
-                dark_texture = texture.copy()
-                dark_surface = pygame.Surface(texture.get_size())
-                dark_surface.fill((128, 128, 128))
-                dark_texture.blit(dark_surface, (0, 0), special_flags=pygame.BLEND_MULT)
-                
-                very_dark_texture = texture.copy()
-                very_dark_surface = pygame.Surface(texture.get_size())
-                very_dark_surface.fill((64, 64, 64))
-                very_dark_texture.blit(very_dark_surface, (0, 0), special_flags=pygame.BLEND_MULT)
-                
-                # Store variants
-                self.textures[f"{texture_id}_dark"] = dark_texture
-                self.textures[f"{texture_id}_very_dark"] = very_dark_texture
+        """Get a font by name, falling back to the medium font."""
+        return self.fonts.get(font_name, self._medium_font)
     
-    def get_texture_variant(self, texture_id, variant="normal"):
-        """Get a specific variant of a texture."""
-        if variant == "normal":
+    def get_texture_variant(self, texture_id, variant=Lighting.NORMAL):
+        """Get a lighting variant of a wall texture, building it on first use.
+        
+        variant is a Lighting value (the old "normal"/"dark"/"very_dark" names
+        still work). Non-wall textures only have the base texture.
+        """
+        if isinstance(variant, str):
+            variant = LIGHTING_NAMES.get(variant, Lighting.NORMAL)
+        try:
+            variant_texture = self._wall_variants[texture_id][variant]
+        except (IndexError, TypeError):
+            # Not a loaded wall id (e.g. "floor"): only the base texture exists
             return self.get_texture(texture_id)
-        else:
-            variant_key = f"{texture_id}_{variant}"
-            return self.textures.get(variant_key, self.get_texture(texture_id))
+        
+        if variant_texture is None:
+            variants = self._wall_variants[texture_id]
+            variant_texture = self.create_dark_variant(variants[Lighting.NORMAL], int(variant))
+            self._store(variants, variant, variant_texture)
+        return variant_texture
+    
+    def create_dark_variant(self, texture, shift):
+        """Darken a texture by right-shifting its channels (1 = half, 2 = quarter brightness)."""
+        size = texture.get_size()
+        scratch = self._darken_scratch.get(size)
+        if scratch is None:
+            # One buffer per resolution; blit_array copies out of it, so it can be reused
+            scratch = np.empty(size + (3,), dtype=np.uint8)
+            self._darken_scratch[size] = scratch
+        
+        # pixels3d is a view of the texture, so the shift reads it without a copy
+        source = pygame.surfarray.pixels3d(texture)
+        np.right_shift(source, shift, out=scratch)
+        del source  # unlock the texture
+        
+        dark_texture = pygame.Surface(size)
+        pygame.surfarray.blit_array(dark_texture, scratch)
+        return dark_texture
     
     def unload_assets(self):
         """Unload all assets to free memory."""
+        if self._loader_thread is not None:
+            # Let in-flight textures land first so they aren't stored after the clear
+            self.wait_for_assets()
         self.textures.clear()
+        self._wall_variants.clear()
+        self._wall_atlas = None
+        self._wall_atlas_index = {}
         self.sounds.clear()
         self.fonts.clear()
+        self._medium_font = None
         self.sprite_textures.clear()
+        self._sprite_lods.clear()
         self.weapon_textures.clear()
+        self._tex_sizes.clear()
+        self._display_format = None
         print("Assets unloaded")
     
     def get_memory_usage(self):
         """Get approximate memory usage of loaded assets."""
-        total_size = 0
-        
-        # Estimate texture memory usage
-        for texture in self.textures.values():
-            if texture:
-                size = texture.get_width() * texture.get_height() * 4  # Assume 32-bit
-                total_size += size
-        
-        for texture in self.sprite_textures.values():
-            if texture:
-                size = texture.get_width() * texture.get_height() * 4
-                total_size += size
-        
-        for texture in self.weapon_textures.values():
-            if texture:
-                size = texture.get_width() * texture.get_height() * 4
-                total_size += size
-        
-        return total_size
+        return sum(self._tex_sizes.values())
     
     def reload_assets(self):
         """Reload all assets (useful for development)."""
         print("Reloading assets...")
+        self.scan_asset_directories()
         self.unload_assets()
         self.load_all_assets()
+        self.wait_for_assets()
         print("Assets reloaded")
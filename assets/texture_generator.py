@@ -3,271 +3,393 @@ Procedural texture generation for the pseudo-3D RPG.
 Generates wall textures, sprites, and other visual assets.
 """
 
+import threading
+import zlib
 import pygame
 import numpy as np
-from config import *
+from numba import jit
+from config import CEILING_TEXTURE_SIZE, ENABLE_NUMBA, FLOOR_TEXTURE_SIZE, SPRITE_LOD
+
+# Fixed seed so a regenerated texture matches the one cached on disk
+TEXTURE_SEED = 42
+
+# Wall texture and enemy sprite sizes in pixels
+TEXTURE_SIZE = 64
+SPRITE_SIZE = 32
+
+# Mipmap edge lengths for sprite level of detail, largest first
+SPRITE_MIP_SIZES = (32, 16, 8)
+
+# Detail line positions for the stone (mortar) and metal (panel) walls
+STONE_MORTAR_ROWS = (15, 31, 47)
+STONE_MORTAR_COLS = (20, 42)
+METAL_H_LINES = (21, 42)
+METAL_V_LINES = (21, 42)
+
+# Metal wall rivet centers, a 3x3 grid
+RIVET_POSITIONS = tuple((x, y) for y in (10, 32, 54) for x in (10, 32, 54))
+
+# Wall materials: base color and per-channel tint applied to the shading offset
+WALL_MATERIALS = {
+    "stone_wall": ((120, 120, 120), (1.0, 1.0, 1.0)),
+    "brick_wall": ((150, 80, 60), (1.0, 1.0, 1.0)),
+    "wood_wall": ((139, 115, 85), (1.0, 0.8, 0.6)),
+    "metal_wall": ((160, 160, 180), (1.0, 1.0, 0.8)),
+}
+
+def texture_rng(name):
+    """Return a Generator seeded from TEXTURE_SEED and the texture's name.
+    
+    Each texture draws from its own stream, so its pixels don't depend on
+    which other textures the loader threads generate first.
+    """
+    return np.random.default_rng((TEXTURE_SEED, zlib.crc32(name.encode())))
+
+def hash2d(x, y, seed):
+    """Hash integer lattice coordinates to floats in [0, 1) with a few multiplies and xors.
+    
+    Pure integer math (wrapping uint32), so no libm calls, and the same
+    coordinates and seed always give the same value.
+    """
+    h = (x.astype(np.uint32) * np.uint32(374761393) + y.astype(np.uint32) * np.uint32(668265263)) ^ np.uint32(seed)
+    h = (h ^ (h >> np.uint32(13))) * np.uint32(1274126177)
+    h ^= h >> np.uint32(16)
+    return (h & np.uint32(0xFFFF)).astype(np.float32) / np.float32(65536)
+
+@jit(nopython=True, cache=True, fastmath=True)
+def value_noise_kernel(grid, out):
+    """Fill out (x, y order) with wrapped value noise from a random lattice grid."""
+    cells_x, cells_y = grid.shape
+    width, height = out.shape
+    for x in range(width):
+        tx = x * cells_x / width
+        x0 = int(tx)
+        fx = tx - x0
+        fx = fx * fx * (3 - 2 * fx)
+        x1 = (x0 + 1) % cells_x
+        for y in range(height):
+            ty = y * cells_y / height
+            y0 = int(ty)
+            fy = ty - y0
+            fy = fy * fy * (3 - 2 * fy)
+            y1 = (y0 + 1) % cells_y
+            
+            top = grid[x0, y0] + (grid[x1, y0] - grid[x0, y0]) * fx
+            bottom = grid[x0, y1] + (grid[x1, y1] - grid[x0, y1]) * fx
+            out[x, y] = top + (bottom - top) * fy
+
+class SpriteLOD:
+    """A sprite and its smaller mipmaps, largest first."""
+    
+    def __init__(self, mipmaps):
+        self.mipmaps = mipmaps
+    
+    def for_size(self, size):
+        """Return the smallest mipmap at least size pixels wide (or the largest one)."""
+        for mipmap in reversed(self.mipmaps):
+            if mipmap.get_width() >= size:
+                return mipmap
+        return self.mipmaps[0]
 
 class TextureGenerator:
     def __init__(self):
         """Initialize the texture generator."""
-        self.texture_size = 64  # Standard texture size
-        self.sprite_size = 32   # Standard sprite size
+        self.texture_size = TEXTURE_SIZE
+        self.sprite_size = SPRITE_SIZE
+        
+        # Shared wall noise, per-material palettes and the batched wall
+        # textures, built on first use
+        self._wall_base = None
+        self._wall_palettes = {}
+        self._flat_palettes = {}
+        self._wall_textures = None
+        self._wall_lock = threading.Lock()
+        
+        # Finished floor, ceiling, sprite and weapon textures, keyed by name
+        self._texture_cache = {}
+        
+        # Metal rivet stamp: a plus of shadow with a bright center (corners keyed out)
+        self._rivet = pygame.Surface((3, 3))
+        self._rivet.fill((180, 180, 200))
+        for corner in [(0, 0), (2, 0), (0, 2), (2, 2)]:
+            self._rivet.set_at(corner, (0, 0, 0))
+        self._rivet.set_at((1, 1), (200, 200, 220))
+        self._rivet.set_colorkey((0, 0, 0))
     
     def generate_wall_texture(self, texture_name):
-        """Generate a procedural wall texture."""
-        texture = pygame.Surface((self.texture_size, self.texture_size))
-        
+        """Generate a procedural wall texture (a copy of the batched one)."""
+        wall_textures = self.generate_all_wall_textures()
+        # Unknown names get the default stone texture
+        return wall_textures.get(texture_name, wall_textures["stone_wall"]).copy()
+    
+    def generate_all_wall_textures(self):
+        """Generate every wall material in one batched pass; returns {name: Surface}.
+        
+        All materials are shaded together as a (materials, size, size) array
+        against the shared noise and their stacked palettes. The result is
+        cached, and the lock makes concurrent callers share one build.
+        """
+        with self._wall_lock:
+            if self._wall_textures is None:
+                names = list(WALL_MATERIALS)
+                rngs = [texture_rng(name) for name in names]
+                patterns, noise_amounts = zip(*(self.wall_pattern(name, rng) for name, rng in zip(names, rngs)))
+                
+                noise = (self.generate_wall_base() * 2 - 1)[None] * np.array(noise_amounts, dtype=np.float32)[:, None, None]
+                shade = np.rint(np.stack(patterns) + noise).astype(np.int16)
+                index = np.clip(shade + 128, 0, 255).astype(np.uint8)
+                palettes = np.stack([self.get_wall_palette(name) for name in names])
+                batch = palettes[np.arange(len(names))[:, None, None], index]
+                
+                # Mortar between the bricks stays flat
+                brick = names.index("brick_wall")
+                batch[brick][~self.brick_mask()] = (100, 90, 80)
+                
+                wall_textures = {}
+                for name, rng, pixels in zip(names, rngs, batch):
+                    texture = pygame.Surface((self.texture_size, self.texture_size))
+                    pygame.surfarray.blit_array(texture, pixels)
+                    self.add_wall_details(name, texture, rng)
+                    wall_textures[name] = texture
+                self._wall_textures = wall_textures
+            return self._wall_textures
+    
+    def wall_pattern(self, texture_name, rng):
+        """Return (shading pattern, noise amount) for a wall material, drawing from rng."""
         if texture_name == "stone_wall":
-            self.generate_stone_texture(texture)
-        elif texture_name == "brick_wall":
-            self.generate_brick_texture(texture)
+            # Two octaves of gradient-like noise
+            return self.wall_noise(8, 20, rng) + self.wall_noise(16, 10, rng), 15
+        if texture_name == "brick_wall":
+            # A low-frequency tint across the bricks
+            return self.wall_noise(8, 10, rng), 20
+        if texture_name == "wood_wall":
+            # Wood grain: noise stretched along x so it runs in horizontal streaks
+            return self.wall_noise((2, 8), 20, rng) + self.wall_noise((4, 24), 15, rng), 10
+        # Metallic reflection: broad, smooth sheen
+        return self.wall_noise(4, 30, rng) + self.wall_noise(8, 15, rng), 10
+    
+    def add_wall_details(self, texture_name, surface, rng):
+        """Draw a material's mortar, plank or panel lines over its shaded pixels."""
+        if texture_name == "stone_wall":
+            self.add_stone_details(surface, rng)
         elif texture_name == "wood_wall":
-            self.generate_wood_texture(texture)
+            self.add_wood_planks(surface, rng)
         elif texture_name == "metal_wall":
-            self.generate_metal_texture(texture)
-        else:
-            # Default stone texture
-            self.generate_stone_texture(texture)
-        
-        return texture
+            self.add_metal_panels(surface)
     
-    def generate_stone_texture(self, surface):
-        """Generate a stone wall texture."""
-        base_color = (120, 120, 120)
-        
-        # Fill with base color
-        surface.fill(base_color)
-        
-        # Add noise for stone texture
-        for y in range(self.texture_size):
-            for x in range(self.texture_size):
-                # Perlin-like noise simulation
-                noise = (
-                    np.sin(x * 0.1) * np.cos(y * 0.1) * 20 +
-                    np.sin(x * 0.3) * np.cos(y * 0.3) * 10 +
-                    np.random.randint(-15, 15)
-                )
-                
-                # Apply noise to base color
-                r = max(0, min(255, base_color[0] + noise))
-                g = max(0, min(255, base_color[1] + noise))
-                b = max(0, min(255, base_color[2] + noise))
-                
-                surface.set_at((x, y), (int(r), int(g), int(b)))
-        
-        # Add some cracks/lines
-        self.add_stone_details(surface)
+    def generate_wall_base(self):
+        """Return the noise field shared by every wall material, in surfarray (x, y) order.
+        
+        Values are float32 in [0, 1); generated once and reused for all walls.
+        """
+        if self._wall_base is None:
+            x, y = np.indices((self.texture_size, self.texture_size))
+            self._wall_base = hash2d(x, y, TEXTURE_SEED)
+        return self._wall_base
     
-    def add_stone_details(self, surface):
-        """Add cracks and details to stone texture."""
-        # Horizontal mortar lines
-        for y in [15, 31, 47]:
-            for x in range(self.texture_size):
-                if np.random.random() < 0.8:  # Not every pixel
-                    color = (80, 80, 80)
-                    surface.set_at((x, y), color)
-        
-        # Vertical mortar lines
-        for x in [20, 42]:
-            for y in range(self.texture_size):
-                if np.random.random() < 0.7:
-                    color = (85, 85, 85)
-                    surface.set_at((x, y), color)
+    def get_wall_palette(self, texture_name):
+        """Return the 256-entry RGB lookup table for a wall material.
+        
+        Entry i is the material's base color shifted by (i - 128) times the
+        per-channel tint, clipped to 0-255.
+        """
+        palette = self._wall_palettes.get(texture_name)
+        if palette is None:
+            base_color, tint = WALL_MATERIALS[texture_name]
+            offsets = np.arange(256, dtype=np.float32)[:, None] - 128
+            palette = np.clip(
+                np.array(base_color, dtype=np.float32) + offsets * np.array(tint, dtype=np.float32),
+                0, 255
+            ).astype(np.uint8)
+            self._wall_palettes[texture_name] = palette
+        return palette
     
-    def generate_brick_texture(self, surface):
-        """Generate a brick wall texture."""
-        mortar_color = (100, 90, 80)
-        brick_color = (150, 80, 60)
-        
-        # Fill with mortar color
-        surface.fill(mortar_color)
-        
-        # Draw bricks
+    def value_noise(self, shape, cells, rng):
+        """Smooth lattice noise in [0, 1), in surfarray (x, y) order.
+        
+        A (cells_x, cells_y) grid of random values is blended bilinearly with a
+        3t^2 - 2t^3 fade. The grid wraps, so the result tiles seamlessly.
+        cells is an int, or an (x, y) pair for stretched noise such as wood grain.
+        The lattice values are drawn from rng.
+        """
+        cells_x, cells_y = (cells, cells) if isinstance(cells, int) else cells
+        grid = rng.random((cells_x, cells_y), dtype=np.float32)
+        
+        if ENABLE_NUMBA:
+            out = np.empty(shape, dtype=np.float32)
+            value_noise_kernel(grid, out)
+            return out
+        
+        tx = np.linspace(0, cells_x, shape[0], endpoint=False, dtype=np.float32)
+        ty = np.linspace(0, cells_y, shape[1], endpoint=False, dtype=np.float32)
+        x0 = tx.astype(np.intp)
+        y0 = ty.astype(np.intp)
+        fx = tx - x0
+        fy = ty - y0
+        fx = (fx * fx * (3 - 2 * fx))[:, None]
+        fy = (fy * fy * (3 - 2 * fy))[None, :]
+        x0 = x0[:, None]
+        y0 = y0[None, :]
+        x1 = (x0 + 1) % cells_x
+        y1 = (y0 + 1) % cells_y
+        
+        top = grid[x0, y0] + (grid[x1, y0] - grid[x0, y0]) * fx
+        bottom = grid[x0, y1] + (grid[x1, y1] - grid[x0, y1]) * fx
+        return top + (bottom - top) * fy
+    
+    def wall_noise(self, cells, amount, rng):
+        """Value noise for a wall texture, centered on zero and spanning +/- amount."""
+        size = self.texture_size
+        return (self.value_noise((size, size), cells, rng) - 0.5) * (2 * amount)
+    
+    def brick_mask(self):
+        """Return a (size, size) bool array, True on brick and False on mortar."""
         brick_height = 8
         brick_width = 16
         mortar_thickness = 2
+        course = brick_height + mortar_thickness
+        stride = brick_width + mortar_thickness
+        x = np.arange(self.texture_size)[:, None]
+        y = np.arange(self.texture_size)[None, :]
+        
+        # Every other course is shifted by half a brick
+        offset = np.where((y // course) % 2 == 1, brick_width // 2, 0)
+        in_course = (y % course >= mortar_thickness) & (y % course < brick_height)
+        in_row = ((x + offset) % stride >= mortar_thickness) & ((x + offset) % stride < brick_width)
+        return in_course & in_row
+    
+    def add_stone_details(self, surface, rng):
+        """Add cracks and details to stone texture."""
+        pixels = pygame.surfarray.pixels3d(surface)
         
-        for row in range(0, self.texture_size, brick_height + mortar_thickness):
-            offset = (brick_width // 2) if (row // (brick_height + mortar_thickness)) % 2 else 0
-            
-            for col in range(-offset, self.texture_size, brick_width + mortar_thickness):
-                # Draw brick rectangle
-                brick_rect = pygame.Rect(
-                    col + mortar_thickness, 
-                    row + mortar_thickness,
-                    brick_width - mortar_thickness,
-                    brick_height - mortar_thickness
-                )
-                
-                # Clip to surface bounds
-                brick_rect = brick_rect.clip(surface.get_rect())
-                
-                if brick_rect.width > 0 and brick_rect.height > 0:
-                    # Fill brick with base color plus noise
-                    for y in range(brick_rect.top, brick_rect.bottom):
-                        for x in range(brick_rect.left, brick_rect.right):
-                            noise = np.random.randint(-20, 20)
-                            r = max(0, min(255, brick_color[0] + noise))
-                            g = max(0, min(255, brick_color[1] + noise))
-                            b = max(0, min(255, brick_color[2] + noise))
-                            surface.set_at((x, y), (r, g, b))
-    
-    def generate_wood_texture(self, surface):
-        """Generate a wood wall texture."""
-        base_color = (139, 115, 85)
-        
-        # Fill with base color
-        surface.fill(base_color)
-        
-        # Add wood grain
-        for y in range(self.texture_size):
-            for x in range(self.texture_size):
-                # Wood grain pattern
-                grain = (
-                    np.sin(y * 0.3 + x * 0.1) * 15 +
-                    np.sin(y * 0.1) * 20 +
-                    np.random.randint(-10, 10)
-                )
-                
-                # Apply grain to base color
-                r = max(0, min(255, base_color[0] + grain))
-                g = max(0, min(255, base_color[1] + grain * 0.8))
-                b = max(0, min(255, base_color[2] + grain * 0.6))
-                
-                surface.set_at((x, y), (int(r), int(g), int(b)))
+        # Horizontal mortar lines
+        for y in STONE_MORTAR_ROWS:
+            mask = rng.random(self.texture_size) < 0.8  # Not every pixel
+            pixels[mask, y] = (80, 80, 80)
         
-        # Add wood planks
-        self.add_wood_planks(surface)
+        # Vertical mortar lines
+        for x in STONE_MORTAR_COLS:
+            mask = rng.random(self.texture_size) < 0.7
+            pixels[x, mask] = (85, 85, 85)
+        
+        del pixels  # unlock the surface
     
-    def add_wood_planks(self, surface):
+    def add_wood_planks(self, surface, rng):
         """Add plank lines to wood texture."""
         plank_height = 16
+        pixels = pygame.surfarray.pixels3d(surface)
         
         for y in range(plank_height, self.texture_size, plank_height):
-            for x in range(self.texture_size):
-                if np.random.random() < 0.6:
-                    color = (100, 85, 65)
-                    surface.set_at((x, y), color)
-                    if y + 1 < self.texture_size:
-                        surface.set_at((x, y + 1), color)
-    
-    def generate_metal_texture(self, surface):
-        """Generate a metal wall texture."""
-        base_color = (160, 160, 180)
-        
-        # Fill with base color
-        surface.fill(base_color)
-        
-        # Add metallic sheen
-        for y in range(self.texture_size):
-            for x in range(self.texture_size):
-                # Metallic reflection pattern
-                reflection = (
-                    np.sin(x * 0.2) * np.cos(y * 0.2) * 30 +
-                    np.sin((x + y) * 0.1) * 15 +
-                    np.random.randint(-10, 10)
-                )
-                
-                # Apply reflection to base color
-                r = max(0, min(255, base_color[0] + reflection))
-                g = max(0, min(255, base_color[1] + reflection))
-                b = max(0, min(255, base_color[2] + reflection * 0.8))
-                
-                surface.set_at((x, y), (int(r), int(g), int(b)))
+            # Two-pixel seam, broken up at random
+            mask = rng.random(self.texture_size) < 0.6
+            pixels[mask, y:y + 2] = (100, 85, 65)
         
-        # Add metal panel lines
-        self.add_metal_panels(surface)
+        del pixels  # unlock the surface
     
     def add_metal_panels(self, surface):
         """Add panel lines to metal texture."""
+        size = self.texture_size
+        
         # Horizontal lines
-        for y in [21, 42]:
-            for x in range(self.texture_size):
-                color = (120, 120, 140)
-                surface.set_at((x, y), color)
+        for y in METAL_H_LINES:
+            surface.fill((120, 120, 140), (0, y, size, 1))
         
         # Vertical lines
-        for x in [21, 42]:
-            for y in range(self.texture_size):
-                color = (140, 140, 160)
-                surface.set_at((x, y), color)
-        
-        # Add rivets
-        rivet_positions = [(10, 10), (32, 10), (54, 10), (10, 32), (32, 32), (54, 32), (10, 54), (32, 54), (54, 54)]
-        for rx, ry in rivet_positions:
-            if 0 <= rx < self.texture_size and 0 <= ry < self.texture_size:
-                # Draw simple rivet
-                rivet_color = (200, 200, 220)
-                surface.set_at((rx, ry), rivet_color)
-                for dx, dy in [(0, 1), (1, 0), (0, -1), (-1, 0)]:
-                    nx, ny = rx + dx, ry + dy
-                    if 0 <= nx < self.texture_size and 0 <= ny < self.texture_size:
-                        surface.set_at((nx, ny), (180, 180, 200))
+        for x in METAL_V_LINES:
+            surface.fill((140, 140, 160), (x, 0, 1, size))
+        
+        # Add rivets (blit clips, and every position is well inside the texture)
+        surface.blits([(self._rivet, (rx - 1, ry - 1)) for rx, ry in RIVET_POSITIONS], doreturn=False)
+    
+    def flat_pixels(self, size, base_color, noise, low=0, high=255):
+        """Build a (size, size, 3) uint8 buffer of base_color plus per-pixel int16 noise.
+        
+        Shared by the floor and ceiling, which differ only in color, noise and
+        clip range. Like the wall palettes, the color math is done once per
+        noise value in a 256-entry table and the pixels are a single gather.
+        """
+        key = (base_color, low, high)
+        palette = self._flat_palettes.get(key)
+        if palette is None:
+            offsets = np.arange(-128, 128, dtype=np.int16)[:, None]
+            palette = np.clip(np.array(base_color, dtype=np.int16) + offsets, low, high).astype(np.uint8)
+            self._flat_palettes[key] = palette
+        return palette[(np.clip(noise, -128, 127) + 128).astype(np.uint8)]
+    
+    def cached_texture(self, key, build, *args):
+        """Return a copy of a generated texture, building it the first time key is asked for.
+        
+        Callers get their own copy, so nothing they do can alter the cached original.
+        """
+        texture = self._texture_cache.get(key)
+        if texture is None:
+            texture = build(*args)
+            self._texture_cache[key] = texture
+        return texture.copy()
     
     def generate_floor_texture(self):
+        """Generate a floor texture with stone tiles."""
+        return self.cached_texture("floor", self.build_floor_texture, texture_rng("floor"))
+    
+    def generate_ceiling_texture(self):
+        """Generate a ceiling texture with stone pattern."""
+        return self.cached_texture("ceiling", self.build_ceiling_texture, texture_rng("ceiling"))
+    
+    def generate_enemy_sprite(self, sprite_name):
+        """Generate a procedural enemy sprite."""
+        return self.cached_texture(("sprite", sprite_name), self.build_enemy_sprite, sprite_name)
+    
+    def build_sprite_lod(self, sprite):
+        """Build a SpriteLOD from a sprite, or None when SPRITE_LOD is off."""
+        if not SPRITE_LOD:
+            return None
+        mipmaps = [sprite]
+        for size in SPRITE_MIP_SIZES[1:]:
+            if size < sprite.get_width():
+                mipmaps.append(pygame.transform.smoothscale(mipmaps[-1], (size, size)))
+        return SpriteLOD(mipmaps)
+    
+    def generate_weapon_texture(self, weapon_type):
+        """Generate a weapon texture for first-person view."""
+        return self.cached_texture(("weapon", weapon_type), self.build_weapon_texture, weapon_type)
+    
+    def build_floor_texture(self, rng):
         """Generate a floor texture with stone tiles."""
         texture = pygame.Surface((FLOOR_TEXTURE_SIZE, FLOOR_TEXTURE_SIZE))
         base_color = (101, 67, 33)  # Brown stone
         
-        # Fill with base color
-        texture.fill(base_color)
+        # Add variation to every tile at once
+        noise = rng.integers(-15, 15, size=(FLOOR_TEXTURE_SIZE, FLOOR_TEXTURE_SIZE), dtype=np.int16)
+        rgb = self.flat_pixels(FLOOR_TEXTURE_SIZE, base_color, noise)
         
-        # Create tile pattern
+        # Add tile borders along the top and left edge of each tile
         tile_size = FLOOR_TEXTURE_SIZE // 4
+        border_color = (80, 50, 20)
+        rgb[:, ::tile_size] = border_color
+        rgb[::tile_size, :] = border_color
         
-        for ty in range(0, FLOOR_TEXTURE_SIZE, tile_size):
-            for tx in range(0, FLOOR_TEXTURE_SIZE, tile_size):
-                # Add variation to each tile
-                for y in range(ty, min(ty + tile_size, FLOOR_TEXTURE_SIZE)):
-                    for x in range(tx, min(tx + tile_size, FLOOR_TEXTURE_SIZE)):
-                        # Add noise
-                        noise = np.random.randint(-15, 15)
-                        r = max(0, min(255, base_color[0] + noise))
-                        g = max(0, min(255, base_color[1] + noise))
-                        b = max(0, min(255, base_color[2] + noise))
-                        texture.set_at((x, y), (r, g, b))
-                
-                # Add tile borders
-                border_color = (80, 50, 20)
-                
-                # Top border
-                for x in range(tx, min(tx + tile_size, FLOOR_TEXTURE_SIZE)):
-                    if ty < FLOOR_TEXTURE_SIZE:
-                        texture.set_at((x, ty), border_color)
-                
-                # Left border
-                for y in range(ty, min(ty + tile_size, FLOOR_TEXTURE_SIZE)):
-                    if tx < FLOOR_TEXTURE_SIZE:
-                        texture.set_at((tx, y), border_color)
-        
+        pygame.surfarray.blit_array(texture, rgb)
         return texture
     
-    def generate_ceiling_texture(self):
+    def build_ceiling_texture(self, rng):
         """Generate a ceiling texture with stone pattern."""
         texture = pygame.Surface((CEILING_TEXTURE_SIZE, CEILING_TEXTURE_SIZE))
         base_color = (64, 64, 64)  # Dark gray
         
-        # Fill with base color
-        texture.fill(base_color)
-        
-        # Add texture variation
-        for y in range(CEILING_TEXTURE_SIZE):
-            for x in range(CEILING_TEXTURE_SIZE):
-                # Stone-like pattern
-                noise = (
-                    np.sin(x * 0.2) * np.cos(y * 0.2) * 15 +
-                    np.random.randint(-10, 10)
-                )
-                
-                r = max(30, min(100, base_color[0] + noise))
-                g = max(30, min(100, base_color[1] + noise))
-                b = max(30, min(100, base_color[2] + noise))
-                
-                texture.set_at((x, y), (int(r), int(g), int(b)))
+        # Add texture variation over the whole texture at once (x, y order)
+        x = np.arange(CEILING_TEXTURE_SIZE, dtype=np.float32)[:, None]
+        y = np.arange(CEILING_TEXTURE_SIZE, dtype=np.float32)[None, :]
+        
+        # Stone-like pattern, quantized to int16 before the color math
+        noise = (
+            (np.sin(x * 0.2) * np.cos(y * 0.2) * 15).astype(np.int16) +
+            rng.integers(-10, 10, size=(CEILING_TEXTURE_SIZE, CEILING_TEXTURE_SIZE), dtype=np.int16)
+        )
         
+        pygame.surfarray.blit_array(texture, self.flat_pixels(CEILING_TEXTURE_SIZE, base_color, noise, 30, 100))
         return texture
     
-    def generate_enemy_sprite(self, sprite_name):
+    def build_enemy_sprite(self, sprite_name):
         """Generate a procedural enemy sprite."""
         sprite = pygame.Surface((self.sprite_size, self.sprite_size), pygame.SRCALPHA)
         
@@ -453,7 +575,7 @@ class TextureGenerator:
         pygame.draw.line(surface, body_color, (12, 28), (10, 32), 2)
         pygame.draw.line(surface, body_color, (20, 28), (22, 32), 2)
     
-    def generate_weapon_texture(self, weapon_type):
+    def build_weapon_texture(self, weapon_type):
         """Generate a weapon texture for first-person view."""
         if weapon_type == "shield":
             size = (64, 64)
@@ -63,6 +63,7 @@ FONT_PATH = "fonts/"
 ENABLE_NUMBA = True
 TEXTURE_FILTERING = True
 SPRITE_LOD = True  # Level of detail for sprites
+SPRITE_CACHE_PIXELS = 2 * SCREEN_WIDTH * SCREEN_HEIGHT  # Pixel budget for scaled, shaded sprites kept between frames
 
 # Game balance
 PLAYER_MAX_HEALTH = 100
@@ -8,96 +8,83 @@ import numpy as np
 from numba import jit, prange
 from config import *
 
-@jit(nopython=True, cache=True)
-def optimized_mode7_render_numpy(width, height, player_x, player_y, cos_a, sin_a, 
-                                texture_array, horizon_height, screen_height, 
-                                texture_width, texture_height, max_render_distance):
-    """Optimized Mode7 rendering using NumPy arrays and Numba JIT."""
-    # Pre-allocate output array
-    output = np.zeros((width, height, 3), dtype=np.uint8)
-    
-    # Calculate perspective values for all pixels in parallel
-    p = screen_height // 2
-    
-    for y in prange(height):
-        screen_y = horizon_height + y
-        if screen_y >= screen_height or screen_y == p:
-            continue
-            
-        # Distance to the floor - safe division
-        pos_z = p / (screen_y - p) if abs(screen_y - p) > 0.001 else 0.001
-        
-        for x in prange(width):
-            # Horizontal distance from camera center
-            screen_x = x - width // 2
-            pos_x = screen_x * pos_z / (width // 2) if width != 0 else 0
-            
-            # Apply rotation
-            rotated_x = pos_x * cos_a - pos_z * sin_a
-            rotated_z = pos_x * sin_a + pos_z * cos_a
-            
-            # Add player position
-            final_x = rotated_x + player_x
-            final_z = rotated_z + player_y
-            
-            # Scale for texture tiling - safe modulo
-            tex_x = int(final_x * texture_width) % texture_width
-            tex_z = int(final_z * texture_height) % texture_height
-            
-            # Ensure texture coordinates are within bounds
-            tex_x = max(0, min(texture_width - 1, tex_x))
-            tex_z = max(0, min(texture_height - 1, tex_z))
-            
-            # Sample texture
-            color_r = texture_array[tex_x, tex_z, 0]
-            color_g = texture_array[tex_x, tex_z, 1] 
-            color_b = texture_array[tex_x, tex_z, 2]
-            
-            # Apply distance-based fog
-            distance = pos_z
-            fog_factor = max(0.2, 1.0 - distance / max_render_distance)
-            
-            # Apply fog to color
-            output[x, y, 0] = int(color_r * fog_factor)
-            output[x, y, 1] = int(color_g * fog_factor)
-            output[x, y, 2] = int(color_b * fog_factor)
-    
-    return output
-
 class Mode7Renderer:
     def __init__(self, asset_manager):
         """Initialize Mode 7 renderer."""
         self.asset_manager = asset_manager
         
-        # Pre-calculate perspective lookup tables for optimization (disabled for now)
-        # self.perspective_table = self.generate_perspective_table()
+        # Debug switch: draw with the slow per-pixel reference path instead of the kernels
+        self.use_fallback = False
+        
+        # Pre-calculate perspective lookup tables for optimization
+        self.perspective_x, self.perspective_z = self.generate_perspective_table()
+        
+        # Fog only depends on a row's depth, so it is computed once per row
+        # rather than per pixel. The horizon row is left black
+        pos_z = self.perspective_z[:, 0]
+        self.fog_row = np.maximum(0.2, 1.0 - pos_z / MAX_RENDER_DISTANCE).astype(np.float32)
+        self.fog_row[HORIZON_HEIGHT + np.arange(len(self.fog_row)) == SCREEN_HEIGHT // 2] = 0.0
+        
+        # The same fog in 8.8 fixed point: color * fog_q8 >> 8
+        self.fog_q8 = (self.fog_row * 256).astype(np.uint16)
+        
+        # Rows past the render distance are fog-clamped, so they are drawn as
+        # one flat color (the texture's mean) instead of being sampled
+        self.far_rows = pos_z > MAX_RENDER_DISTANCE
         
         # Floor and ceiling surfaces
         self.floor_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT // 2))
         self.ceiling_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT // 2))
         
+        # Floor and ceiling texture pixels and mean color, copied out once per
+        # texture Surface: {is_ceiling: (texture, array, mean color)}
+        self._texture_arrays = {}
+        
+        # Stand-ins for a floor or ceiling texture that isn't loaded, built once
+        # so the texture array cache stays valid between frames
+        self.default_floor_texture = self.create_default_floor_texture()
+        self.default_ceiling_texture = self.create_default_ceiling_texture()
+        
+        self.warm_up()
+        
+    def warm_up(self):
+        """Compile the Mode 7 kernel now (or load it from Numba's cache) instead of on the first frame.
+        
+        The dummy arguments have the same types as a real call; pixels3d views
+        are not contiguous, so neither is the dummy output.
+        """
+        if not ENABLE_NUMBA:
+            return
+        texture_array = np.zeros((2, 2, 3), dtype=np.uint8)
+        pixels = np.zeros((2, 2, 3), dtype=np.uint8)[:, ::-1]
+        fast_mode7_render(
+            texture_array, pixels, self.perspective_x, self.perspective_z,
+            np.float32(0), np.float32(0), np.float32(1), np.float32(0),
+            1, 1, self.fog_q8, self.far_rows, texture_array[0, 0]
+        )
+        
     def generate_perspective_table(self):
-        """Pre-calculate perspective transformation values."""
-        table = np.zeros((SCREEN_HEIGHT // 2, SCREEN_WIDTH, 2))
+        """Pre-calculate perspective transformation values.
         
-        for y in range(SCREEN_HEIGHT // 2):
-            screen_y = HORIZON_HEIGHT + y
-            if screen_y >= SCREEN_HEIGHT:
-                continue
-                
-            # Distance to the floor
-            p = SCREEN_HEIGHT // 2
-            pos_z = p / (screen_y - p) if screen_y != p else 0.001
-            
-            for x in range(SCREEN_WIDTH):
-                # Horizontal distance from camera center
-                screen_x = x - SCREEN_WIDTH // 2
-                pos_x = screen_x * pos_z / (SCREEN_WIDTH // 2)
-                
-                table[y, x, 0] = pos_x
-                table[y, x, 1] = pos_z
-                
-        return table
+        Returns separate (rows, columns) float32 arrays for the camera-space x
+        and z of every floor pixel, so each one is contiguous on its own.
+        """
+        perspective_x = np.zeros((SCREEN_HEIGHT // 2, SCREEN_WIDTH), dtype=np.float32)
+        perspective_z = np.zeros((SCREEN_HEIGHT // 2, SCREEN_WIDTH), dtype=np.float32)
+        
+        # Distance to the floor for each row (rows past the screen bottom stay zero)
+        p = SCREEN_HEIGHT // 2
+        screen_y = HORIZON_HEIGHT + np.arange(SCREEN_HEIGHT // 2)
+        rows = screen_y < SCREEN_HEIGHT
+        offset = screen_y[rows] - p
+        pos_z = np.where(offset == 0, 0.001, p / np.where(offset == 0, 1, offset))
+        
+        # Horizontal distance from camera center, scaled by each row's depth
+        screen_x = np.arange(SCREEN_WIDTH) - SCREEN_WIDTH // 2
+        perspective_x[rows] = pos_z[:, None] * screen_x / (SCREEN_WIDTH // 2)
+        perspective_z[rows] = pos_z[:, None]
+        
+        return perspective_x, perspective_z
     
     def render_floor_ceiling(self, screen, player_x, player_y, player_angle):
         """Render floor and ceiling using Mode 7 perspective."""
@@ -106,9 +93,9 @@ class Mode7Renderer:
         ceiling_texture = self.asset_manager.get_texture("ceiling")
         
         if floor_texture is None:
-            floor_texture = self.create_default_floor_texture()
+            floor_texture = self.default_floor_texture
         if ceiling_texture is None:
-            ceiling_texture = self.create_default_ceiling_texture()
+            ceiling_texture = self.default_ceiling_texture
             
         # Render floor
         self.render_horizontal_surface(
@@ -123,42 +110,87 @@ class Mode7Renderer:
         # Blit to main screen
         screen.blit(self.floor_surface, (0, HORIZON_HEIGHT))
         
-        # Flip ceiling vertically and blit to top half
-        flipped_ceiling = pygame.transform.flip(self.ceiling_surface, False, True)
-        screen.blit(flipped_ceiling, (0, 0))
+        # The ceiling is rendered upside down already, so it goes straight to the top half
+        screen.blit(self.ceiling_surface, (0, 0))
     
     def render_horizontal_surface(self, surface, texture, player_x, player_y, player_angle, is_ceiling):
-        """Render a horizontal surface with optimized Mode 7 perspective."""
-        surface.fill((0, 0, 0))  # Clear surface
+        """Render a horizontal surface with optimized Mode 7 perspective.
         
-        # Rotation matrix for player angle
-        cos_a = np.cos(player_angle)
-        sin_a = np.sin(player_angle)
+        The kernels write every pixel, so the surface isn't cleared first.
+        Ceilings are written with the rows reversed, ready to blit above the horizon.
+        """
+        # Rotation matrix for player angle. Everything per pixel is float32,
+        # so the scalars are too (a float64 would promote the whole expression)
+        cos_a = np.float32(np.cos(player_angle))
+        sin_a = np.float32(np.sin(player_angle))
+        player_x = np.float32(player_x)
+        player_y = np.float32(player_y)
         
         texture_width = texture.get_width()
         texture_height = texture.get_height()
         
-        try:
-            # Try optimized NumPy/Numba rendering
-            texture_array = pygame.surfarray.array3d(texture)
-            
-            # Use optimized function
-            result_array = optimized_mode7_render_numpy(
-                surface.get_width(), surface.get_height(),
-                player_x, player_y, cos_a, sin_a,
-                texture_array, HORIZON_HEIGHT, SCREEN_HEIGHT,
-                texture_width, texture_height, MAX_RENDER_DISTANCE
-            )
-            
-            # Convert back to surface
-            pygame.surfarray.blit_array(surface, result_array)
-            
-        except Exception:
-            # Fallback to working but slower pixel-by-pixel rendering
+        if self.use_fallback:
+            surface.fill((0, 0, 0))
             self.render_fallback_mode7(surface, texture, player_x, player_y, player_angle, is_ceiling)
+            if is_ceiling:
+                surface.blit(pygame.transform.flip(surface, False, True), (0, 0))
+            return
+        
+        texture_array, mean_color = self.get_texture_array(texture, is_ceiling)
+        
+        if not ENABLE_NUMBA:
+            self.render_numpy(surface, texture_array, mean_color, player_x, player_y, cos_a, sin_a, is_ceiling)
+            return
+        
+        # Render straight into the surface's pixels, with no intermediate array or blit
+        pixels = pygame.surfarray.pixels3d(surface)
+        if is_ceiling:
+            pixels = pixels[:, ::-1]  # Flipped view, no copy
+        fast_mode7_render(
+            texture_array, pixels, self.perspective_x, self.perspective_z,
+            player_x, player_y, cos_a, sin_a,
+            texture_width - 1, texture_height - 1, self.fog_q8, self.far_rows, mean_color
+        )
+        del pixels  # unlock the surface
+    
+    def get_texture_array(self, texture, is_ceiling):
+        """Return a texture's (x, y, 3) pixels and mean color, copying them only when the texture changes.
+        
+        Texture coordinates are wrapped with a bit mask, so both sides must be
+        powers of two; the asset manager rejects any other size at load time.
+        """
+        cached = self._texture_arrays.get(is_ceiling)
+        if cached is None or cached[0] is not texture:
+            texture_array = pygame.surfarray.array3d(texture)
+            mean_color = texture_array.mean(axis=(0, 1)).astype(np.uint8)
+            cached = (texture, texture_array, mean_color)
+            self._texture_arrays[is_ceiling] = cached
+        return cached[1], cached[2]
+    
+    def render_numpy(self, surface, texture_array, mean_color, player_x, player_y, cos_a, sin_a, is_ceiling):
+        """Mode 7 without Numba: rotate the whole perspective table and gather texels at once."""
+        texture_width, texture_height = texture_array.shape[:2]
+        
+        # Camera-space positions in surfarray (x, y) order
+        pos_x = self.perspective_x.T
+        pos_z = self.perspective_z.T
+        
+        # Apply rotation and player position
+        final_x = pos_x * cos_a - pos_z * sin_a + player_x
+        final_z = pos_x * sin_a + pos_z * cos_a + player_y
+        
+        # Scale for texture tiling (truncate like int(), then wrap with the power-of-two mask)
+        tex_x = (final_x * texture_width).astype(np.int32) & (texture_width - 1)
+        tex_z = (final_z * texture_height).astype(np.int32) & (texture_height - 1)
+        
+        fogged = (texture_array[tex_x, tex_z] * self.fog_q8[None, :, None]) >> 8
+        fogged[:, self.far_rows] = (mean_color * self.fog_q8[self.far_rows, None]) >> 8
+        if is_ceiling:
+            fogged = fogged[:, ::-1]
+        pygame.surfarray.blit_array(surface, fogged.astype(np.uint8))
     
     def render_fallback_mode7(self, surface, texture, player_x, player_y, player_angle, is_ceiling):
-        """Fallback Mode 7 rendering - pixel by pixel but guaranteed to work."""
+        """Reference Mode 7 rendering, pixel by pixel (use_fallback); far too slow for normal play."""
         cos_a = np.cos(player_angle)
         sin_a = np.sin(player_angle)
         
@@ -166,16 +198,19 @@ class Mode7Renderer:
         texture_height = texture.get_height()
         
         for y in range(surface.get_height()):
-            for x in range(surface.get_width()):
-                # Map screen coordinates to world space using perspective transformation
-                screen_y = HORIZON_HEIGHT + y
-                if screen_y >= SCREEN_HEIGHT:
-                    continue
-                    
-                # Distance to the floor - safe division
-                p = SCREEN_HEIGHT // 2
-                pos_z = p / (screen_y - p) if abs(screen_y - p) > 0.001 else 0.001
+            # Map screen coordinates to world space using perspective transformation
+            screen_y = HORIZON_HEIGHT + y
+            if screen_y >= SCREEN_HEIGHT:
+                continue
                 
+            # Distance to the floor - safe division
+            p = SCREEN_HEIGHT // 2
+            pos_z = p / (screen_y - p) if abs(screen_y - p) > 0.001 else 0.001
+            
+            # Distance-based fog, which only depends on the row
+            fog_factor = max(0.2, 1.0 - pos_z / MAX_RENDER_DISTANCE)
+            
+            for x in range(surface.get_width()):
                 # Horizontal distance from camera center
                 screen_x = x - SCREEN_WIDTH // 2
                 pos_x = screen_x * pos_z / (SCREEN_WIDTH // 2) if SCREEN_WIDTH != 0 else 0
@@ -199,10 +234,6 @@ class Mode7Renderer:
                 try:
                     color = texture.get_at((tex_x, tex_z))
                     
-                    # Apply distance-based fog
-                    distance = pos_z
-                    fog_factor = max(0.2, 1.0 - distance / MAX_RENDER_DISTANCE)
-                    
                     fogged_color = (
                         int(color[0] * fog_factor),
                         int(color[1] * fog_factor),
@@ -219,108 +250,56 @@ class Mode7Renderer:
     
     def create_default_floor_texture(self):
         """Create a default procedural floor texture."""
-        texture = pygame.Surface((FLOOR_TEXTURE_SIZE, FLOOR_TEXTURE_SIZE))
-        
-        for y in range(FLOOR_TEXTURE_SIZE):
-            for x in range(FLOOR_TEXTURE_SIZE):
-                # Checkerboard pattern
-                if (x // 8 + y // 8) % 2:
-                    color = (120, 80, 40)  # Darker brown
-                else:
-                    color = (100, 70, 35)  # Brown
-                    
-                # Add some noise
-                noise = np.random.randint(-10, 10)
-                color = (
-                    max(0, min(255, color[0] + noise)),
-                    max(0, min(255, color[1] + noise)),
-                    max(0, min(255, color[2] + noise))
-                )
-                
-                texture.set_at((x, y), color)
-                
-        return texture
+        # Arrays are in surfarray (x, y) order
+        x, y = np.indices((FLOOR_TEXTURE_SIZE, FLOOR_TEXTURE_SIZE))
+        
+        # Checkerboard pattern of darker brown and brown
+        checker = ((x // 8 + y // 8) % 2).astype(bool)
+        color = np.where(checker[..., None], (120, 80, 40), (100, 70, 35))
+        
+        # Add some noise (the same amount on every channel)
+        noise = np.random.randint(-10, 10, (FLOOR_TEXTURE_SIZE, FLOOR_TEXTURE_SIZE, 1))
+        
+        return pygame.surfarray.make_surface(np.clip(color + noise, 0, 255).astype(np.uint8))
     
     def create_default_ceiling_texture(self):
         """Create a default procedural ceiling texture."""
-        texture = pygame.Surface((CEILING_TEXTURE_SIZE, CEILING_TEXTURE_SIZE))
-        
-        for y in range(CEILING_TEXTURE_SIZE):
-            for x in range(CEILING_TEXTURE_SIZE):
-                # Stone-like pattern
-                base_color = 80
-                variation = int(20 * np.sin(x * 0.3) * np.cos(y * 0.3))
-                
-                gray_value = max(40, min(120, base_color + variation))
-                color = (gray_value, gray_value, gray_value)
-                
-                texture.set_at((x, y), color)
-                
-        return texture
-    
-    def render_simple_mode7(self, surface, texture, player_x, player_y, player_angle, is_ceiling):
-        """Simple Mode 7 rendering fallback without Numba."""
-        cos_a = np.cos(player_angle)
-        sin_a = np.sin(player_angle)
+        x, y = np.indices((CEILING_TEXTURE_SIZE, CEILING_TEXTURE_SIZE))
         
-        texture_width = texture.get_width()
-        texture_height = texture.get_height()
+        # Stone-like pattern
+        base_color = 80
+        variation = (20 * np.sin(x * 0.3) * np.cos(y * 0.3)).astype(np.int32)
+        gray = np.clip(base_color + variation, 40, 120).astype(np.uint8)
         
-        for y in range(surface.get_height()):
-            for x in range(surface.get_width()):
-                # Calculate perspective values directly
-                screen_y = y
-                p = surface.get_height() // 2
-                pos_z = p / (screen_y - p + 1)  # Avoid division by zero
-                screen_x = x - surface.get_width() // 2
-                pos_x = screen_x * pos_z / (surface.get_width() // 2)
-                world_x = pos_x
-                world_z = pos_z
-                
-                # Apply rotation
-                rotated_x = world_x * cos_a - world_z * sin_a
-                rotated_z = world_x * sin_a + world_z * cos_a
-                
-                # Add player position
-                final_x = rotated_x + player_x
-                final_z = rotated_z + player_y
-                
-                # Scale for texture tiling
-                tex_x = int(final_x * texture_width) % texture_width
-                tex_z = int(final_z * texture_height) % texture_height
-                
-                try:
-                    color = texture.get_at((tex_x, tex_z))
-                    
-                    # Apply distance-based fog
-                    distance = np.sqrt(world_x * world_x + world_z * world_z)
-                    fog_factor = max(0.3, 1.0 - distance / MAX_RENDER_DISTANCE)
-                    
-                    fogged_color = (
-                        int(color[0] * fog_factor),
-                        int(color[1] * fog_factor),
-                        int(color[2] * fog_factor)
-                    )
-                    
-                    surface.set_at((x, y), fogged_color)
-                except (IndexError, ValueError):
-                    if is_ceiling:
-                        surface.set_at((x, y), CEILING_COLOR)
-                    else:
-                        surface.set_at((x, y), FLOOR_COLOR)
+        return pygame.surfarray.make_surface(np.repeat(gray[..., None], 3, axis=2))
 
-@jit(nopython=True)
-def fast_mode7_render(texture_array, surface_array, perspective_table, 
+@jit(nopython=True, parallel=True, fastmath=True, boundscheck=False, cache=True)
+def fast_mode7_render(texture_array, surface_array, perspective_x, perspective_z, 
                       player_x, player_y, cos_a, sin_a, 
-                      texture_width, texture_height, max_distance):
-    """Numba-optimized Mode 7 rendering for better performance."""
-    height, width = surface_array.shape[:2]
+                      texture_mask_x, texture_mask_z, fog_q8, far_rows, far_color):
+    """Numba-optimized Mode 7 rendering for better performance.
+    
+    surface_array is in surfarray (x, y) order; fog_q8 holds each row's fog
+    factor in 8.8 fixed point. Rows flagged in far_rows are filled with the
+    fogged far_color instead of sampling the texture. The texture sides are
+    powers of two and texture_mask_* is size - 1. The coordinates are float32
+    throughout.
+    """
+    width, height = surface_array.shape[:2]
+    texture_scale_x = np.float32(texture_mask_x + 1)
+    texture_scale_z = np.float32(texture_mask_z + 1)
     
-    for y in range(height):
+    # Rows are independent, so they are split across threads
+    for y in prange(height):
+        fog_factor = np.uint16(fog_q8[y])
+        if far_rows[y]:
+            for c in range(3):
+                surface_array[:, y, c] = (far_color[c] * fog_factor) >> 8
+            continue
         for x in range(width):
-            if y < perspective_table.shape[0] and x < perspective_table.shape[1]:
-                world_x = perspective_table[y, x, 0]
-                world_z = perspective_table[y, x, 1]
+            if y < perspective_x.shape[0] and x < perspective_x.shape[1]:
+                world_x = perspective_x[y, x]
+                world_z = perspective_z[y, x]
                 
                 # Apply rotation
                 rotated_x = world_x * cos_a - world_z * sin_a
@@ -330,20 +309,15 @@ def fast_mode7_render(texture_array, surface_array, perspective_table,
                 final_x = rotated_x + player_x
                 final_z = rotated_z + player_y
                 
-                # Calculate texture coordinates
-                tex_x = int(final_x * texture_width) % texture_width
-                tex_z = int(final_z * texture_height) % texture_height
+                # Calculate texture coordinates; the mask wraps negatives too,
+                # so they are always in range
+                tex_x = np.int32(final_x * texture_scale_x) & texture_mask_x
+                tex_z = np.int32(final_z * texture_scale_z) & texture_mask_z
                 
-                # Bounds checking
-                if 0 <= tex_x < texture_width and 0 <= tex_z < texture_height:
-                    # Get color from texture
-                    color = texture_array[tex_x, tex_z]
-                    
-                    # Apply distance fog
-                    distance = np.sqrt(world_x * world_x + world_z * world_z)
-                    fog_factor = max(0.3, 1.0 - distance / max_distance)
-                    
-                    # Apply fog to color
-                    surface_array[x, y, 0] = int(color[0] * fog_factor)
-                    surface_array[x, y, 1] = int(color[1] * fog_factor)
-                    surface_array[x, y, 2] = int(color[2] * fog_factor)
+                # Get color from texture
+                color = texture_array[tex_x, tex_z]
+                
+                # Apply fog to color
+                surface_array[x, y, 0] = (color[0] * fog_factor) >> 8
+                surface_array[x, y, 1] = (color[1] * fog_factor) >> 8
+                surface_array[x, y, 2] = (color[2] * fog_factor) >> 8
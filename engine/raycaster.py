@@ -4,42 +4,72 @@ Optimized with NumPy and Numba for performance.
 """
 
 import numpy as np
-from numba import jit
+from numba import jit, prange
 from config import *
 
+# One record of hit information per screen column
+RAY_DTYPE = np.dtype([
+    ('hit', '?'),
+    ('distance', 'f4'),
+    ('texture_id', 'i4'),
+    ('texture_x', 'f4'),
+    ('side', 'i1'),
+    ('map_x', 'i4'),
+    ('map_y', 'i4'),
+])
+
 class RayCaster:
     def __init__(self):
         """Initialize the raycasting engine."""
         # Pre-calculate ray angles for optimization
         self.ray_angles = np.linspace(-FOV / 2, FOV / 2, NUM_RAYS)
         
+        # Ray directions relative to the view direction; each frame rotates them
+        # by the player angle (angle addition) instead of calling cos/sin per ray
+        self.cos_rel = np.cos(self.ray_angles)
+        self.sin_rel = np.sin(self.ray_angles)
+        
+        # Filled in place by every cast_rays call; a recarray, so fields read as rays.distance
+        self.rays = np.recarray(NUM_RAYS, dtype=RAY_DTYPE)
+        
+        # World map handles, refreshed by set_world
+        self._world = None
+        self._map = None
+        self._width = 0
+        self._height = 0
+        
+        self.warm_up()
+        
+    def warm_up(self):
+        """Compile the ray kernels now (or load them from Numba's cache) instead of on the first frame."""
+        world_array = np.ones((2, 2), dtype=int)
+        fast_cast_all(
+            1.5, 1.5, np.cos(0.0), np.sin(0.0), self.cos_rel[:1], self.sin_rel[:1],
+            world_array, 2, 2, self.rays[:1]
+        )
+        
+    def set_world(self, world):
+        """Cache the world's map array and size; call again whenever the map is replaced."""
+        self._world = world
+        self._map = world.get_map_array()
+        self._width = world.width
+        self._height = world.height
+        
     def cast_rays(self, player_x, player_y, player_angle, world):
-        """Cast all rays and return hit information using optimized Numba function."""
-        rays = []
-        world_array = world.get_map_array()  # Get NumPy array representation
-        
-        for i in range(NUM_RAYS):
-            ray_angle = player_angle + self.ray_angles[i]
-            dx = np.cos(ray_angle)
-            dy = np.sin(ray_angle)
-            
-            # Use optimized Numba function
-            hit, distance, texture_id, texture_x, side, map_x, map_y = fast_dda(
-                player_x, player_y, dx, dy, world_array, world.width, world.height
-            )
-            
-            ray_data = {
-                'hit': hit,
-                'distance': distance,
-                'texture_id': texture_id,
-                'texture_x': texture_x,
-                'side': side,
-                'map_x': map_x,
-                'map_y': map_y
-            }
-            rays.append(ray_data)
-            
-        return rays
+        """Cast all rays with one Numba call and return them as a RAY_DTYPE recarray.
+        
+        The same array is reused, so it is overwritten by the next call.
+        A different world is picked up automatically; an in-place map change
+        (World.from_dict) needs an explicit set_world.
+        """
+        if world is not self._world:
+            self.set_world(world)
+        
+        fast_cast_all(
+            player_x, player_y, np.cos(player_angle), np.sin(player_angle), self.cos_rel, self.sin_rel,
+            self._map, self._width, self._height, self.rays
+        )
+        return self.rays
     
     def cast_single_ray(self, start_x, start_y, angle, world):
         """Cast a single ray and return hit information."""
@@ -157,7 +187,7 @@ class RayCaster:
                 
         return False, max_distance, int(x), int(y)
 
-@jit(nopython=True)
+@jit(nopython=True, cache=True)
 def fast_dda(start_x, start_y, dx, dy, world_array, world_width, world_height):
     """Numba-optimized DDA algorithm for better performance."""
     x, y = start_x, start_y
@@ -221,3 +251,22 @@ def fast_dda(start_x, start_y, dx, dy, world_array, world_width, world_height):
     wall_x -= int(wall_x)
     
     return hit, perp_wall_dist, texture_id, wall_x, side, map_x, map_y
+
+@jit(nopython=True, parallel=True, cache=True)
+def fast_cast_all(player_x, player_y, cos_a, sin_a, cos_rel, sin_rel, world_array, world_width, world_height, rays):
+    """Cast one ray per relative direction (cos_rel, sin_rel), rotated by the player angle, into rays (RAY_DTYPE)."""
+    for i in prange(cos_rel.shape[0]):
+        # cos/sin of (player angle + ray angle) by angle addition
+        dx = cos_a * cos_rel[i] - sin_a * sin_rel[i]
+        dy = sin_a * cos_rel[i] + cos_a * sin_rel[i]
+        hit, distance, texture_id, texture_x, side, map_x, map_y = fast_dda(
+            player_x, player_y, dx, dy, world_array, world_width, world_height
+        )
+        ray = rays[i]
+        ray.hit = hit
+        ray.distance = distance
+        ray.texture_id = texture_id
+        ray.texture_x = texture_x
+        ray.side = side
+        ray.map_x = map_x
+        ray.map_y = map_y
@@ -5,95 +5,144 @@ Handles wall rendering, sprite rendering, and visual effects.
 
 import pygame
 import numpy as np
-from numba import jit
+from numba import jit, prange
 from config import *
+from engine.raycaster import RAY_DTYPE
 
 class Renderer:
     def __init__(self, screen, asset_manager):
         """Initialize the renderer with screen surface and asset manager."""
         self.screen = screen
         self.asset_manager = asset_manager
-        self.z_buffer = np.zeros(SCREEN_WIDTH)
+        self.z_buffer = np.full(SCREEN_WIDTH, np.inf, dtype=np.float32)
         
         # Pre-calculate wall heights for optimization
         self.wall_heights = np.zeros(SCREEN_WIDTH)
         
-    def render_walls(self, rays):
-        """Render walls using optimized batch operations."""
-        # Extract distances and update z-buffer in batch
-        distances = np.array([ray['distance'] if ray['hit'] else float('inf') for ray in rays])
-        self.z_buffer = distances
-        
-        # Render wall slices
-        for i, ray in enumerate(rays):
-            if ray['hit'] and ray['distance'] > 0.001:  # Avoid division by zero
-                self.render_wall_slice(i, ray)
-                
-    def render_wall_slice(self, x, ray):
-        """Render a single vertical slice of a wall."""
-        # Calculate wall height on screen
-        distance = ray['distance']
-        if distance == 0:
-            distance = 0.001  # Prevent division by zero
-            
-        wall_height = int(SCREEN_HEIGHT / distance)
+        # Wall textures stacked by texture id, and the asset atlas they were built from
+        self._wall_atlas = None
+        self._wall_atlas_source = None
         
-        # Calculate wall start and end positions
-        wall_start = max(0, (SCREEN_HEIGHT - wall_height) // 2)
-        wall_end = min(SCREEN_HEIGHT, (SCREEN_HEIGHT + wall_height) // 2)
+        # Camera-space x/depth to screen-column scale
+        self._projection = (SCREEN_WIDTH / 2) / np.tan(FOV / 2)
         
-        # Store z-buffer value
-        self.z_buffer[x] = distance
+        # Scaled, shaded sprites from recent frames, oldest first, and their total pixel count
+        self._scaled_sprites = {}
+        self._scaled_pixels = 0
         
-        # Get wall texture
-        texture = self.asset_manager.get_texture(ray['texture_id'])
-        if texture is None:
-            # Fallback to solid color
-            color = self.get_wall_color(ray['texture_id'])
-            pygame.draw.line(self.screen, color, (x, wall_start), (x, wall_end))
+        # The equipped weapon at rest, scaled and premultiplied: ((texture, size), surface)
+        self._resting_weapon = (None, None)
+        
+        # Scratch buffer for sprite shading, grown to the largest sprite drawn
+        self._shade_scratch = np.empty((64, 64, 3), dtype=np.uint16)
+        
+        # Pre-drawn spell effect pieces: a heal sparkle (radius 3 circle, black
+        # keyed out) with its five angles, and the translucent shield overlay
+        self._heal_sparkle = pygame.Surface((7, 7))
+        self._heal_sparkle.set_colorkey((0, 0, 0))
+        pygame.draw.circle(self._heal_sparkle, (0, 255, 0), (3, 3), 3)
+        self._heal_angles = np.arange(5) * np.pi * 2 / 5
+        
+        self._shield_overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self._shield_overlay.set_alpha(30)
+        self._shield_overlay.fill((0, 0, 255))
+        pygame.draw.rect(self._shield_overlay, (0, 100, 255), self._shield_overlay.get_rect(), 5)
+        
+        # Screen row numbers, broadcast against each column's wall span
+        self._rows = np.arange(SCREEN_HEIGHT, dtype=np.int32)
+        
+        self.warm_up()
+        
+    def warm_up(self):
+        """Compile the wall kernel now (or load it from Numba's cache) instead of on the first frame.
+        
+        The dummy arguments have the same types as a real call; pixels3d views
+        are not contiguous, so neither is the dummy screen.
+        """
+        if not ENABLE_NUMBA:
             return
-            
-        # Calculate texture coordinates
-        tex_x = int(ray['texture_x'] * texture.get_width()) % texture.get_width()
+        screen_array = np.zeros((2, 2, 3), dtype=np.uint8)[:, ::-1]
+        atlas = np.zeros((1, 1, 1, 3), dtype=np.uint8)
+        rays = np.recarray(1, dtype=RAY_DTYPE)
+        rays.hit = False
+        z_buffer = np.zeros(2, dtype=np.float32)
+        render_walls_kernel(screen_array, z_buffer, atlas, rays)
+        
+    def get_wall_atlas(self):
+        """Return the wall textures as one (texture id, x, y, 3) uint8 array.
+        
+        Built from the asset manager's wall atlas, and rebuilt only when that
+        changes. Ids with no texture are filled with their flat fallback color.
+        """
+        source, index = self.asset_manager.get_wall_atlas()
+        if self._wall_atlas is not None and source is self._wall_atlas_source:
+            return self._wall_atlas
+        
+        count = max(list(index) + [4]) + 1
+        size = source.shape[1:3] if source is not None else (64, 64)
+        atlas = np.empty((count,) + tuple(size) + (3,), dtype=np.uint8)
+        for texture_id in range(count):
+            if texture_id in index:
+                atlas[texture_id] = source[index[texture_id]]
+            else:
+                atlas[texture_id] = self.get_wall_color(texture_id)
+        
+        self._wall_atlas = atlas
+        self._wall_atlas_source = source
+        return atlas
         
-        # Apply distance-based shading
-        shade_factor = min(1.0, 5.0 / distance)
+    def render_walls(self, rays):
+        """Render every wall column in one pass (rays is RayCaster's RAY_DTYPE recarray)."""
+        atlas = self.get_wall_atlas()
+        if not ENABLE_NUMBA:
+            # Update z-buffer in batch
+            self.z_buffer.fill(np.inf)
+            np.copyto(self.z_buffer, rays.distance, where=rays.hit)
+            self.render_walls_numpy(rays, atlas)
+            return
         
-        # Render textured wall slice
-        self.render_textured_wall_slice(
-            x, wall_start, wall_end, texture, tex_x, shade_factor
-        )
+        # One lock of the screen pixels for the whole frame; the kernel fills the z-buffer too
+        screen_array = pygame.surfarray.pixels3d(self.screen)
+        render_walls_kernel(screen_array, self.z_buffer, atlas, rays)
+        del screen_array  # unlock the surface
     
-    def render_textured_wall_slice(self, x, wall_start, wall_end, texture, tex_x, shade_factor):
-        """Render a textured wall slice with shading using optimized array operations."""
-        wall_height = wall_end - wall_start
-        if wall_height <= 0:
+    def render_walls_numpy(self, rays, atlas):
+        """Wall rendering without Numba: sample every column's span with array operations."""
+        # Columns with a wall, skipping near-zero distances (avoid division by zero)
+        columns = np.flatnonzero(rays.hit & (rays.distance > 0.001))
+        if len(columns) == 0:
             return
-            
-        tex_height = texture.get_height()
+        distance = rays.distance[columns]
         
-        # Get texture column as array for faster access
-        try:
-            texture_array = pygame.surfarray.array3d(texture)
-            screen_array = pygame.surfarray.pixels3d(self.screen)
-            
-            # Vectorized texture sampling
-            y_coords = np.arange(wall_start, wall_end)
-            tex_y_coords = ((y_coords - wall_start) / wall_height * tex_height).astype(np.int32) % tex_height
-            
-            # Sample texture column
-            tex_colors = texture_array[tex_x, tex_y_coords]
-            
-            # Apply shading
-            shaded_colors = (tex_colors * shade_factor).astype(np.uint8)
-            
-            # Copy to screen
-            screen_array[x, wall_start:wall_end] = shaded_colors.T
-            
-        except (IndexError, ValueError):
-            # Fallback to simple colored line
-            color = (int(128 * shade_factor), int(128 * shade_factor), int(128 * shade_factor))
-            pygame.draw.line(self.screen, color, (x, wall_start), (x, wall_end))
+        texture_count, tex_width, tex_height = atlas.shape[:3]
+        texture_id = rays.texture_id[columns]
+        texture_id = np.where(texture_id < texture_count, texture_id, 0)
+        
+        # Calculate wall start and end positions
+        wall_height = (SCREEN_HEIGHT / distance).astype(np.int32)
+        wall_start = np.clip((SCREEN_HEIGHT - wall_height) // 2, 0, SCREEN_HEIGHT)
+        wall_end = np.clip((SCREEN_HEIGHT + wall_height) // 2, 0, SCREEN_HEIGHT)
+        visible_height = np.maximum(wall_end - wall_start, 1)
+        
+        # Only the rows some wall reaches need sampling
+        rows = self._rows[wall_start.min():wall_end.max()]
+        inside = (rows >= wall_start[:, None]) & (rows < wall_end[:, None])
+        
+        # Texture coordinates: the visible part of each column spans the whole texture height
+        tex_x = (rays.texture_x[columns] * tex_width).astype(np.int32) % tex_width
+        tex_step = tex_height / visible_height
+        tex_y = ((rows - wall_start[:, None]) * tex_step[:, None]).astype(np.int32) % tex_height
+        
+        # Sample the atlas and apply distance-based shading in 8.8 fixed point
+        shade_q8 = (np.minimum(1.0, 5.0 / distance) * 256).astype(np.uint16)
+        colors = atlas[texture_id[:, None], tex_x[:, None], tex_y].astype(np.uint16)
+        colors = ((colors * shade_q8[:, None, None]) >> 8).astype(np.uint8)
+        
+        # One lock of the screen pixels for the whole frame
+        column_index, row_index = np.nonzero(inside)
+        screen_array = pygame.surfarray.pixels3d(self.screen)
+        screen_array[columns[column_index], rows[row_index]] = colors[column_index, row_index]
+        del screen_array  # unlock the surface
     
     def get_wall_color(self, texture_id):
         """Get fallback color for wall texture ID."""
@@ -107,61 +156,53 @@ class Renderer:
     
     def render_sprites(self, sprites, player_x, player_y, player_angle):
         """Render sprites (enemies, items) in 3D space."""
-        # Sort sprites by distance (back to front)
-        sprite_distances = []
-        for sprite in sprites:
-            dx = sprite.x - player_x
-            dy = sprite.y - player_y
-            distance = np.sqrt(dx * dx + dy * dy)
-            sprite_distances.append((distance, sprite))
-        
-        # Sort by distance (farthest first)
-        sprite_distances.sort(key=lambda x: x[0], reverse=True)
-        
-        # Render each sprite
-        for distance, sprite in sprite_distances:
-            self.render_sprite(sprite, player_x, player_y, player_angle, distance)
-    
-    def render_sprite(self, sprite, player_x, player_y, player_angle, distance):
-        """Render a single sprite in 3D space."""
-        if distance > MAX_RENDER_DISTANCE:
+        if not sprites:
             return
-            
-        # Calculate sprite position relative to player
-        dx = sprite.x - player_x
-        dy = sprite.y - player_y
+        
+        # Project every sprite at once
+        count = len(sprites)
+        dx = np.fromiter((sprite.x for sprite in sprites), dtype=np.float32, count=count) - player_x
+        dy = np.fromiter((sprite.y for sprite in sprites), dtype=np.float32, count=count) - player_y
+        distance = np.hypot(dx, dy)
         
         # Transform to camera space
         cos_a = np.cos(-player_angle)
         sin_a = np.sin(-player_angle)
-        
         sprite_x = dx * cos_a - dy * sin_a
         sprite_y = dx * sin_a + dy * cos_a
         
-        # Skip sprites behind the player
-        if sprite_y <= 0.1:
-            return
-            
-        # Project to screen coordinates
-        screen_x = int(SCREEN_WIDTH / 2 + (sprite_x / sprite_y) * (SCREEN_WIDTH / 2) / np.tan(FOV / 2))
-        
-        # Calculate sprite size based on distance
-        sprite_size = int(SCREEN_HEIGHT / sprite_y)
-        
-        # Skip sprites outside screen bounds
-        if screen_x < -sprite_size or screen_x > SCREEN_WIDTH + sprite_size:
-            return
-            
+        # Skip sprites out of range or behind the player
+        visible = np.flatnonzero((distance <= MAX_RENDER_DISTANCE) & (sprite_y > 0.1))
+        sprite_x = sprite_x[visible]
+        sprite_y = sprite_y[visible]
+        
+        # Project to screen coordinates; sprite size is based on distance
+        screen_x = (SCREEN_WIDTH / 2 + sprite_x / sprite_y * self._projection).astype(np.int32)
+        sprite_size = (SCREEN_HEIGHT / sprite_y).astype(np.int32)
+        
+        # Cull sprites outside the view before any per-sprite work
+        on_screen = np.flatnonzero((screen_x >= -sprite_size) & (screen_x <= SCREEN_WIDTH + sprite_size))
+        visible = visible[on_screen]
+        screen_x = screen_x[on_screen]
+        sprite_size = sprite_size[on_screen]
+        sprite_y = sprite_y[on_screen]
+        
+        # Render back to front (farthest first)
+        for i in np.argsort(-distance[visible], kind="stable"):
+            self.render_sprite(
+                sprites[visible[i]], int(screen_x[i]), int(sprite_size[i]),
+                float(sprite_y[i]), float(distance[visible[i]])
+            )
+    
+    def render_sprite(self, sprite, screen_x, sprite_size, depth, distance):
+        """Render a single projected sprite, centered on screen column screen_x."""
         # Get sprite texture
-        texture = self.asset_manager.get_sprite_texture(sprite.sprite_id)
+        texture = self.asset_manager.get_sprite_texture(sprite.sprite_id, sprite_size)
         if texture is None:
             # Fallback to colored rectangle
-            self.render_sprite_fallback(screen_x, sprite_size, sprite_y, sprite.color)
+            self.render_sprite_fallback(screen_x, sprite_size, depth, sprite.color)
             return
             
-        # Scale texture to sprite size
-        scaled_texture = pygame.transform.scale(texture, (sprite_size, sprite_size))
-        
         # Calculate sprite position on screen
         sprite_screen_y = (SCREEN_HEIGHT - sprite_size) // 2
         sprite_rect = pygame.Rect(
@@ -171,13 +212,19 @@ class Renderer:
             sprite_size
         )
         
-        # Check z-buffer for visibility
-        if self.is_sprite_visible(sprite_rect, sprite_y):
-            # Apply distance-based shading
+        # Check z-buffer for the columns not hidden behind walls
+        spans = self.get_visible_spans(sprite_rect, depth)
+        if spans:
+            # Apply distance-based shading and scale to sprite size
             shade_factor = min(1.0, 3.0 / distance)
-            shaded_texture = self.apply_sprite_shading(scaled_texture, shade_factor)
+            shaded_texture = self.get_scaled_sprite(texture, sprite_size, shade_factor)
             
-            self.screen.blit(shaded_texture, sprite_rect)
+            # Blit only the visible column spans
+            self.screen.blits([
+                (shaded_texture, (start, sprite_rect.top),
+                 pygame.Rect(start - sprite_rect.left, 0, end - start, sprite_size))
+                for start, end in spans
+            ], doreturn=False)
     
     def render_sprite_fallback(self, screen_x, sprite_size, depth, color):
         """Render a fallback colored rectangle for sprites without textures."""
@@ -189,51 +236,70 @@ class Renderer:
         )
         
         # Check z-buffer
-        if self.is_sprite_visible(sprite_rect, depth):
-            pygame.draw.rect(self.screen, color, sprite_rect)
+        for start, end in self.get_visible_spans(sprite_rect, depth):
+            pygame.draw.rect(self.screen, color, (start, sprite_rect.top, end - start, sprite_size))
     
-    def is_sprite_visible(self, sprite_rect, depth):
-        """Check if sprite is visible using vectorized z-buffer operations."""
+    def get_visible_spans(self, sprite_rect, depth):
+        """Return the [start, end) screen column spans of sprite_rect that are in front of the walls."""
         start_x = max(0, sprite_rect.left)
-        end_x = min(SCREEN_WIDTH, sprite_rect.right)
-        
-        if start_x >= end_x or end_x > len(self.z_buffer):
-            return False
+        end_x = min(SCREEN_WIDTH, sprite_rect.right, len(self.z_buffer))
+        if start_x >= end_x:
+            return []
+        
+        # Vectorized comparison; span edges are where visibility changes
+        visible = (depth < self.z_buffer[start_x:end_x]).astype(np.int8)
+        edges = np.flatnonzero(np.diff(visible, prepend=0, append=0)) + start_x
+        return list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+    
+    def get_scaled_sprite(self, texture, size, shade_factor):
+        """Return texture shaded and scaled to size x size, reusing the result while size and shade stay the same.
+        
+        The small mipmap is shaded before scaling; with nearest-neighbour
+        scaling that gives the same pixels for far less work. Sprites taller
+        than the screen change size every frame of an approach and are too
+        big to keep, so they aren't cached.
+        """
+        key = (texture, size, min(256, int(shade_factor * 256)))
+        scaled = self._scaled_sprites.get(key)
+        if scaled is None:
+            shaded = self.apply_sprite_shading(texture.copy(), shade_factor)
+            scaled = pygame.transform.scale(shaded, (size, size))
+            if size > SCREEN_HEIGHT:
+                return scaled
             
-        # Vectorized comparison
-        relevant_depths = self.z_buffer[start_x:end_x]
-        return np.any(depth < relevant_depths)
+            # Drop the oldest entries until the new one fits the pixel budget
+            self._scaled_pixels += size * size
+            while self._scaled_pixels > SPRITE_CACHE_PIXELS:
+                old_size = self._scaled_sprites.pop(next(iter(self._scaled_sprites))).get_width()
+                self._scaled_pixels -= old_size * old_size
+            self._scaled_sprites[key] = scaled
+        return scaled
     
     def apply_sprite_shading(self, texture, shade_factor):
-        """Apply distance-based shading to sprite texture."""
+        """Apply distance-based shading to a sprite texture in place (pass a copy, not a cached texture)."""
         if shade_factor >= 1.0:
             return texture
-            
-        # Create a shaded copy
-        shaded = texture.copy()
-        
-        # Apply color multiplication for shading
-        color_filter = pygame.Surface(texture.get_size())
-        color_filter.fill((
-            int(255 * shade_factor),
-            int(255 * shade_factor),
-            int(255 * shade_factor)
-        ))
-        
-        shaded.blit(color_filter, (0, 0), special_flags=pygame.BLEND_MULT)
-        return shaded
+        
+        # Multiply the RGB channels by an 8.8 fixed-point shade in a reused buffer
+        pixels = pygame.surfarray.pixels3d(texture)
+        if any(n > m for n, m in zip(pixels.shape, self._shade_scratch.shape)):
+            self._shade_scratch = np.empty(np.maximum(pixels.shape, self._shade_scratch.shape), dtype=np.uint16)
+        scratch = self._shade_scratch[:pixels.shape[0], :pixels.shape[1]]
+        np.multiply(pixels, np.uint16(shade_factor * 256), out=scratch)
+        scratch >>= 8
+        pixels[...] = scratch
+        del pixels  # unlock the surface
+        return texture
     
     def render_weapon(self, weapon):
         """Render the equipped weapon in first-person view like classic dungeon crawlers."""
         if weapon is None:
             return
             
-        weapon_texture = self.asset_manager.get_weapon_texture(weapon.name)
+        # Weapon textures are keyed by sprite id ("sword"), not display name ("Iron Sword")
+        weapon_texture = self.asset_manager.get_weapon_texture(weapon.sprite_id)
         if weapon_texture is None:
-            # Try fallback with weapon type
-            weapon_texture = self.asset_manager.get_weapon_texture(weapon.weapon_type if hasattr(weapon, 'weapon_type') else weapon.name)
-            if weapon_texture is None:
-                return
+            return
         
         # Calculate weapon size - larger for dramatic first-person view
         base_width = SCREEN_WIDTH // 2  # Half screen width
@@ -267,19 +333,29 @@ class Renderer:
         final_width = int(base_width * scale_factor)
         final_height = int(base_height * scale_factor)
         
-        # Scale weapon texture
-        scaled_weapon = pygame.transform.scale(weapon_texture, (final_width, final_height))
-        
         # Create weapon rect
         weapon_rect = pygame.Rect(weapon_x, weapon_y, final_width, final_height)
         
         # Render weapon (always on top)
-        self.screen.blit(scaled_weapon, weapon_rect)
+        if scale_factor == 1.0:
+            # Resting pose: reuse the pre-scaled, premultiplied surface
+            resting_weapon = self.get_resting_weapon(weapon_texture, (final_width, final_height))
+            self.screen.blit(resting_weapon, weapon_rect, special_flags=pygame.BLEND_PREMULTIPLIED)
+        else:
+            scaled_weapon = pygame.transform.scale(weapon_texture, (final_width, final_height))
+            self.screen.blit(scaled_weapon, weapon_rect)
         
         # Add attack effect flash
         if hasattr(weapon, 'is_attacking') and weapon.is_attacking:
             self.render_weapon_attack_effect(weapon_rect)
     
+    def get_resting_weapon(self, texture, size):
+        """Return texture scaled to size with premultiplied alpha; only the last weapon is kept."""
+        key = (texture, size)
+        if self._resting_weapon[0] != key:
+            self._resting_weapon = (key, pygame.transform.scale(texture, size).premul_alpha())
+        return self._resting_weapon[1]
+    
     def render_weapon_attack_effect(self, weapon_rect):
         """Render visual effect for weapon attacks."""
         # Create subtle attack flash overlay
@@ -330,25 +406,16 @@ class Renderer:
     
     def render_heal_effect(self, effect):
         """Render healing spell effect."""
-        # Green sparkles around target
-        center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
-        
-        for i in range(5):
-            angle = effect.animation_time * 5 + i * np.pi * 2 / 5
-            x = center[0] + int(np.cos(angle) * 30)
-            y = center[1] + int(np.sin(angle) * 30)
-            pygame.draw.circle(self.screen, (0, 255, 0), (x, y), 3)
+        # Green sparkles around target, all placed and blitted at once
+        angles = effect.animation_time * 5 + self._heal_angles
+        x = SCREEN_WIDTH // 2 + (np.cos(angles) * 30).astype(np.int32) - 3
+        y = SCREEN_HEIGHT // 2 + (np.sin(angles) * 30).astype(np.int32) - 3
+        self.screen.blits([(self._heal_sparkle, pos) for pos in zip(x.tolist(), y.tolist())], doreturn=False)
     
     def render_shield_effect(self, effect):
         """Render shield spell effect."""
         # Blue glow around screen edges
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-        overlay.set_alpha(30)
-        overlay.fill((0, 0, 255))
-        
-        # Draw border
-        pygame.draw.rect(overlay, (0, 100, 255), overlay.get_rect(), 5)
-        self.screen.blit(overlay, (0, 0))
+        self.screen.blit(self._shield_overlay, (0, 0))
     
     def clear_z_buffer(self):
         """Clear the z-buffer for the next frame using optimized NumPy operations."""
@@ -357,4 +424,45 @@ class Renderer:
     def update_z_buffer_vectorized(self, distances):
         """Update z-buffer with vectorized operations for better performance."""
         if len(distances) == len(self.z_buffer):
-            self.z_buffer = np.minimum(self.z_buffer, distances)
+            np.minimum(self.z_buffer, distances, out=self.z_buffer)
+
+@jit(nopython=True, parallel=True, fastmath=True, cache=True)
+def render_walls_kernel(screen_array, z_buffer, atlas, rays):
+    """Draw the textured, shaded wall slice of every hit column into screen_array ((x, y) order).
+    
+    atlas is (texture id, x, y, 3); unknown texture ids use entry 0. The visible
+    part of each column spans the whole texture height. Each column's wall
+    distance (inf where the ray hit nothing) is written to z_buffer.
+    """
+    texture_count, tex_width, tex_height = atlas.shape[:3]
+    screen_width, screen_height = screen_array.shape[:2]
+    
+    # Columns are independent, so they are split across threads
+    for x in prange(min(rays.shape[0], screen_width, z_buffer.shape[0])):
+        ray = rays[x]
+        z_buffer[x] = ray.distance if ray.hit else np.inf
+        if not ray.hit or ray.distance <= 0.001:  # Avoid division by zero
+            continue
+        distance = ray.distance
+        
+        # Calculate wall start and end positions
+        wall_height = int(screen_height / distance)
+        wall_start = max(0, (screen_height - wall_height) // 2)
+        wall_end = min(screen_height, (screen_height + wall_height) // 2)
+        if wall_end <= wall_start:
+            continue
+        span = wall_end - wall_start
+        
+        texture_id = ray.texture_id if ray.texture_id < texture_count else 0
+        tex_x = int(ray.texture_x * tex_width) % tex_width
+        
+        # Texture rows advance by a fixed step down the column
+        tex_step = tex_height / span
+        
+        # Distance-based shading in 8.8 fixed point
+        shade_q8 = np.uint16(min(1.0, 5.0 / distance) * 256)
+        
+        for y in range(wall_start, wall_end):
+            tex_y = int((y - wall_start) * tex_step) % tex_height
+            for c in range(3):
+                screen_array[x, y, c] = np.uint8((atlas[texture_id, tex_x, tex_y, c] * shade_q8) >> 8)
@@ -3,9 +3,11 @@ Combat system for the pseudo-3D RPG.
 Handles weapon mechanics, damage calculation, and combat animations.
 """
 
+import random
 import pygame
 import numpy as np
 from config import *
+from game.world import line_of_sight
 
 class Weapon:
     def __init__(self, name, weapon_type, damage, attack_speed, range_val, sprite_id):
@@ -137,11 +139,11 @@ class CombatSystem:
         # Add attacker level bonus
         level_bonus = attacker.level * 2 if hasattr(attacker, 'level') else 0
         
-        # Add random variation
-        damage_variation = np.random.uniform(0.8, 1.2)
+        # Add random variation (stdlib random: far cheaper than NumPy for one draw)
+        damage_variation = random.uniform(0.8, 1.2)
         
         # Calculate critical hit
-        critical_hit = np.random.random() < CRITICAL_HIT_CHANCE
+        critical_hit = random.random() < CRITICAL_HIT_CHANCE
         critical_multiplier = 2.0 if critical_hit else 1.0
         
         # Apply fatigue penalty if applicable
@@ -183,33 +185,21 @@ class CombatSystem:
         if weapon.type != 'melee':
             return []
         
-        hit_enemies = []
-        
-        # Calculate attack direction
-        attack_angle = attacker.angle
-        attack_range = weapon.range
-        
-        # Check for enemies in attack arc
-        for enemy in enemies:
-            # Calculate distance and angle to enemy
-            dx = enemy.x - attacker.x
-            dy = enemy.y - attacker.y
-            distance = np.sqrt(dx * dx + dy * dy)
-            
-            if distance <= attack_range:
-                # Calculate angle to enemy
-                enemy_angle = np.arctan2(dy, dx)
-                angle_diff = abs(enemy_angle - attack_angle)
-                
-                # Normalize angle difference
-                if angle_diff > np.pi:
-                    angle_diff = 2 * np.pi - angle_diff
-                
-                # Check if enemy is in attack arc (45-degree cone)
-                if angle_diff <= np.pi / 4:
-                    hit_enemies.append(enemy)
-        
-        return hit_enemies
+        if not enemies:
+            return []
+        
+        # Distance and angle to every enemy at once
+        count = len(enemies)
+        dx = np.fromiter((enemy.x for enemy in enemies), dtype=np.float32, count=count) - attacker.x
+        dy = np.fromiter((enemy.y for enemy in enemies), dtype=np.float32, count=count) - attacker.y
+        in_range = dx * dx + dy * dy <= weapon.range * weapon.range
+        
+        # Angle difference from the attack direction, wrapped to [0, pi]
+        angle_diff = np.abs((np.arctan2(dy, dx) - attacker.angle + np.pi) % (2 * np.pi) - np.pi)
+        
+        # Check for enemies in attack arc (45-degree cone)
+        hit = in_range & (angle_diff <= np.pi / 4)
+        return [enemies[i] for i in np.flatnonzero(hit)]
     
     def check_ranged_hit(self, attacker, weapon, target_x, target_y, world):
         """Check if a ranged attack hits."""
@@ -224,22 +214,11 @@ class CombatSystem:
         if distance > weapon.range:
             return False
         
-        # Check for obstacles in the path
-        steps = int(distance * 10)  # 10 steps per unit
-        for i in range(1, steps):
-            progress = i / steps
-            check_x = attacker.x + dx * progress
-            check_y = attacker.y + dy * progress
-            
-            map_x = int(check_x)
-            map_y = int(check_y)
-            
-            if (map_x < 0 or map_x >= world.width or 
-                map_y < 0 or map_y >= world.height or
-                world.get_cell(map_x, map_y) > 0):
-                return False  # Hit a wall
-        
-        return True
+        # Check for walls in the path; the map array (not blocked_grid) lets projectiles pass closed doors
+        return line_of_sight(
+            float(attacker.x), float(attacker.y), float(target_x), float(target_y),
+            world.get_map_array()
+        )
     
     def create_projectile(self, attacker, weapon, target_x, target_y):
         """Create a projectile for ranged attacks."""
@@ -3,11 +3,75 @@ Enemy AI and management system for the pseudo-3D RPG.
 Handles enemy behavior, pathfinding, and combat AI.
 """
 
+import math
+import random
 import pygame
 import numpy as np
 from config import *
+from game.world import line_of_sight
+
+# Stats for each enemy type; unknown types use the goblin's
+ENEMY_STATS = {
+    'goblin': {
+        'health': 20,
+        'damage': 5,
+        'speed': 0.6,  # Reduced from 1.2
+        'sight_range': 6.0,
+        'attack_range': 1.2
+    },
+    'orc': {
+        'health': 40,
+        'damage': 12,
+        'speed': 0.5,  # Reduced from 1.0
+        'sight_range': 8.0,
+        'attack_range': 1.5
+    },
+    'skeleton': {
+        'health': 15,
+        'damage': 8,
+        'speed': 0.4,  # Reduced from 0.8
+        'sight_range': 10.0,
+        'attack_range': 2.0
+    },
+    'troll': {
+        'health': 80,
+        'damage': 20,
+        'speed': 0.3,  # Reduced from 0.6
+        'sight_range': 5.0,
+        'attack_range': 2.5
+    },
+    'spider': {
+        'health': 12,
+        'damage': 6,
+        'speed': 0.8,  # Reduced from 1.8
+        'sight_range': 4.0,
+        'attack_range': 1.0
+    }
+}
+
+# Fallback sprite color for each enemy type
+ENEMY_COLORS = {
+    'goblin': (0, 128, 0),      # Green
+    'orc': (128, 64, 0),        # Brown
+    'skeleton': (200, 200, 200), # Light gray
+    'troll': (64, 128, 64),     # Dark green
+    'spider': (64, 0, 64)       # Purple
+}
 
 class Enemy:
+    # Fixed attribute set, no per-instance __dict__; shield_bonus and
+    # speed_bonus are set by buff spells cast on the enemy. manager and
+    # index locate the enemy's entries in its EnemyManager's arrays
+    __slots__ = (
+        'x', 'y', 'start_x', 'start_y', 'type', 'sprite_id',
+        'max_health', 'health', 'damage', 'speed', 'sight_range', 'attack_range',
+        'state', 'target', 'last_seen_x', 'last_seen_y', 'patrol_points', 'current_patrol_index',
+        'angle', 'velocity_x', 'velocity_y', 'target_velocity_x', 'target_velocity_y',
+        'is_moving', 'momentum', 'attack_cooldown', 'last_attack_time',
+        'path', 'path_index', 'color', 'animation_time',
+        'shield_bonus', 'speed_bonus', 'manager', 'index'
+    )
+    
     def __init__(self, x, y, enemy_type, sprite_id):
         """Initialize an enemy."""
         self.x = x
@@ -55,57 +119,17 @@ class Enemy:
         self.color = self.get_enemy_color(enemy_type)
         self.animation_time = 0.0
         
+        # Set by EnemyManager.sync_arrays
+        self.manager = None
+        self.index = -1
+        
     def get_enemy_stats(self, enemy_type):
         """Get stats for different enemy types."""
-        enemy_stats = {
-            'goblin': {
-                'health': 20,
-                'damage': 5,
-                'speed': 0.6,  # Reduced from 1.2
-                'sight_range': 6.0,
-                'attack_range': 1.2
-            },
-            'orc': {
-                'health': 40,
-                'damage': 12,
-                'speed': 0.5,  # Reduced from 1.0
-                'sight_range': 8.0,
-                'attack_range': 1.5
-            },
-            'skeleton': {
-                'health': 15,
-                'damage': 8,
-                'speed': 0.4,  # Reduced from 0.8
-                'sight_range': 10.0,
-                'attack_range': 2.0
-            },
-            'troll': {
-                'health': 80,
-                'damage': 20,
-                'speed': 0.3,  # Reduced from 0.6
-                'sight_range': 5.0,
-                'attack_range': 2.5
-            },
-            'spider': {
-                'health': 12,
-                'damage': 6,
-                'speed': 0.8,  # Reduced from 1.8
-                'sight_range': 4.0,
-                'attack_range': 1.0
-            }
-        }
-        return enemy_stats.get(enemy_type, enemy_stats['goblin'])
+        return ENEMY_STATS.get(enemy_type, ENEMY_STATS['goblin'])
     
     def get_enemy_color(self, enemy_type):
         """Get color for different enemy types."""
-        colors = {
-            'goblin': (0, 128, 0),      # Green
-            'orc': (128, 64, 0),        # Brown
-            'skeleton': (200, 200, 200), # Light gray
-            'troll': (64, 128, 64),     # Dark green
-            'spider': (64, 0, 64)       # Purple
-        }
-        return colors.get(enemy_type, (128, 0, 0))  # Default red
+        return ENEMY_COLORS.get(enemy_type, (128, 0, 0))  # Default red
     
     def update(self, player, world, delta_time):
         """Update enemy AI and behavior."""
@@ -127,16 +151,14 @@ class Enemy:
             self.last_seen_x = player.x
             self.last_seen_y = player.y
             
-            distance_to_player = self.distance_to(player.x, player.y)
-            
-            if distance_to_player <= self.attack_range:
+            if self.distance_squared_to(player.x, player.y) <= self.attack_range * self.attack_range:
                 self.state = "ATTACK"
             else:
                 self.state = "CHASE"
         else:
             if self.state == "CHASE":
                 # Continue to last seen position
-                if self.distance_to(self.last_seen_x, self.last_seen_y) < 0.5:
+                if self.distance_squared_to(self.last_seen_x, self.last_seen_y) < 0.25:  # 0.5 units
                     self.state = "IDLE"
             elif self.state == "ATTACK":
                 self.state = "IDLE"
@@ -156,31 +178,18 @@ class Enemy:
     
     def can_see_player(self, player, world):
         """Check if the enemy can see the player."""
-        distance = self.distance_to(player.x, player.y)
-        if distance > self.sight_range:
+        if self.distance_squared_to(player.x, player.y) > self.sight_range * self.sight_range:
             return False
         
-        # Check line of sight
-        steps = int(distance * 10)  # 10 steps per unit
-        if steps == 0:
-            return True
-        
-        dx = (player.x - self.x) / steps
-        dy = (player.y - self.y) / steps
-        
-        for i in range(1, steps):
-            check_x = self.x + dx * i
-            check_y = self.y + dy * i
-            
-            if not world.is_passable(check_x, check_y):
-                return False
-        
-        return True
+        # Check line of sight through walls and closed doors
+        return line_of_sight(
+            float(self.x), float(self.y), float(player.x), float(player.y), world.blocked_grid
+        )
     
     def behavior_idle(self, delta_time):
         """Idle behavior - stand still or wander."""
         # Occasionally start patrolling
-        if np.random.random() < 0.001:  # 0.1% chance per frame
+        if random.random() < 0.001:  # 0.1% chance per frame
             if len(self.patrol_points) == 0:
                 self.create_patrol_route()
             if len(self.patrol_points) > 0:
@@ -193,9 +202,7 @@ class Enemy:
             return
         
         target_point = self.patrol_points[self.current_patrol_index]
-        distance = self.distance_to(target_point[0], target_point[1])
-        
-        if distance < 0.5:
+        if self.distance_squared_to(target_point[0], target_point[1]) < 0.25:  # 0.5 units
             # Reached patrol point, move to next
             self.current_patrol_index = (self.current_patrol_index + 1) % len(self.patrol_points)
         else:
@@ -205,27 +212,27 @@ class Enemy:
     def behavior_chase(self, world, delta_time):
         """Chase behavior - pursue the player."""
         # Simple direct movement toward last seen position
-        if self.distance_to(self.last_seen_x, self.last_seen_y) > 0.5:
+        if self.distance_squared_to(self.last_seen_x, self.last_seen_y) > 0.25:  # 0.5 units
             self.move_toward(self.last_seen_x, self.last_seen_y, delta_time)
     
     def behavior_attack(self, player, delta_time):
         """Attack behavior - attack the player."""
         if self.attack_cooldown <= 0:
             # Perform attack
-            damage = self.damage + np.random.randint(-2, 3)  # Damage variation
+            damage = self.damage + random.randint(-2, 2)  # Damage variation
             player.take_damage(damage)
             self.attack_cooldown = 2.0  # 2 seconds between attacks
             
             # Face the player
             dx = player.x - self.x
             dy = player.y - self.y
-            self.angle = np.arctan2(dy, dx)
+            self.angle = math.atan2(dy, dx)
     
     def move_toward(self, target_x, target_y, delta_time):
         """Move toward a target position with smooth momentum."""
         dx = target_x - self.x
         dy = target_y - self.y
-        distance = np.sqrt(dx * dx + dy * dy)
+        distance = math.hypot(dx, dy)
         
         if distance > 0.1:  # Avoid jittering when very close
             # Normalize direction
@@ -238,7 +245,7 @@ class Enemy:
             self.is_moving = True
             
             # Update facing angle smoothly
-            target_angle = np.arctan2(dy, dx)
+            target_angle = math.atan2(dy, dx)
             angle_diff = target_angle - self.angle
             # Normalize angle difference to [-pi, pi]
             while angle_diff > np.pi:
@@ -285,13 +292,23 @@ class Enemy:
             self.velocity_y *= -0.1  # Small bounce back
             self.target_velocity_y *= 0.5  # Reduce target speed when hitting walls
         
+        if self.manager is not None:
+            self.manager.xs[self.index] = self.x
+            self.manager.ys[self.index] = self.y
+        
         # Stop moving if velocities are very low
         if abs(self.velocity_x) < 0.01 and abs(self.velocity_y) < 0.01:
             self.is_moving = False
     
     def distance_to(self, x, y):
         """Calculate distance to a point."""
-        return np.sqrt((self.x - x)**2 + (self.y - y)**2)
+        return math.hypot(self.x - x, self.y - y)
+    
+    def distance_squared_to(self, x, y):
+        """Calculate squared distance to a point, for comparing against a squared range."""
+        dx = self.x - x
+        dy = self.y - y
+        return dx * dx + dy * dy
     
     def take_damage(self, damage):
         """Apply damage to the enemy."""
@@ -299,6 +316,8 @@ class Enemy:
         if self.health <= 0:
             self.health = 0
             self.state = "DEAD"
+            if self.manager is not None:
+                self.manager.alive[self.index] = False
     
     def create_patrol_route(self):
         """Create a simple patrol route around the starting position."""
@@ -349,8 +368,21 @@ class EnemyManager:
         self.asset_manager = asset_manager
         self.enemies = []
         
+        # Enemy positions and alive flags as arrays, indexed like self.enemies,
+        # for the area and ray queries. Rebuilt by sync_arrays when the list
+        # changes; enemies write their own entries as they move and die
+        self.xs = np.zeros(0)
+        self.ys = np.zeros(0)
+        self.alive = np.zeros(0, dtype=bool)
+        
         # Spawn initial enemies
         self.spawn_initial_enemies()
+        
+        self.warm_up()
+    
+    def warm_up(self):
+        """Compile the line-of-sight kernel now (or load it from Numba's cache) instead of on the first enemy update."""
+        line_of_sight(0.5, 0.5, 1.5, 0.5, np.zeros((1, 2), dtype=np.uint8))
     
     def spawn_initial_enemies(self):
         """Spawn initial enemies across the large world."""
@@ -374,10 +406,28 @@ class EnemyManager:
             if self.world.is_passable(x, y):
                 enemy = Enemy(x, y, enemy_type, f"{enemy_type}_sprite")
                 self.enemies.append(enemy)
+        self.sync_arrays()
+    
+    def sync_arrays(self):
+        """Rebuild xs, ys and alive from the enemy list, and point each enemy at its index.
+        
+        Called after anything that adds, removes or reorders enemies.
+        """
+        for index, enemy in enumerate(self.enemies):
+            enemy.manager = self
+            enemy.index = index
+        count = len(self.enemies)
+        self.xs = np.fromiter((enemy.x for enemy in self.enemies), dtype=np.float64, count=count)
+        self.ys = np.fromiter((enemy.y for enemy in self.enemies), dtype=np.float64, count=count)
+        self.alive = np.fromiter((enemy.state != "DEAD" for enemy in self.enemies), dtype=bool, count=count)
+    
+    def select_enemies(self, indices):
+        """Return the enemies at the given indices."""
+        return [self.enemies[i] for i in indices]
     
     def update(self, player, delta_time):
         """Update all enemies."""
-        for enemy in self.enemies[:]:  # Copy list to avoid modification during iteration
+        for enemy in self.enemies:  # Enemy.update never adds or removes enemies
             if enemy.state == "DEAD":
                 # Remove dead enemies after a delay
                 continue
@@ -386,58 +436,36 @@ class EnemyManager:
     
     def check_ray_hit(self, start_x, start_y, angle, max_distance):
         """Check if a ray hits any enemy."""
-        ray_dx = np.cos(angle)
-        ray_dy = np.sin(angle)
+        ray_dx = math.cos(angle)
+        ray_dy = math.sin(angle)
         
-        closest_enemy = None
-        closest_distance = max_distance
+        # Vector from ray start to every enemy
+        to_enemy_x = self.xs - start_x
+        to_enemy_y = self.ys - start_y
         
-        for enemy in self.enemies:
-            if enemy.state == "DEAD":
-                continue
-            
-            # Vector from ray start to enemy
-            to_enemy_x = enemy.x - start_x
-            to_enemy_y = enemy.y - start_y
-            
-            # Project enemy position onto ray direction
-            projection = to_enemy_x * ray_dx + to_enemy_y * ray_dy
-            
-            if projection < 0 or projection > max_distance:
-                continue  # Enemy is behind ray start or too far
-            
-            # Calculate perpendicular distance from ray to enemy
-            perp_distance = abs(to_enemy_x * ray_dy - to_enemy_y * ray_dx)
-            
-            if perp_distance <= 0.5:  # Enemy radius
-                distance = projection
-                if distance < closest_distance:
-                    closest_distance = distance
-                    closest_enemy = enemy
+        # Project enemy positions onto ray direction, and the perpendicular distance from the ray
+        projection = to_enemy_x * ray_dx + to_enemy_y * ray_dy
+        perp_distance = np.abs(to_enemy_x * ray_dy - to_enemy_y * ray_dx)
+        
+        # In front of the ray start, in range, and within the enemy radius
+        hit = self.alive & (projection >= 0) & (projection < max_distance) & (perp_distance <= 0.5)
         
-        return closest_enemy
+        # Closest first
+        candidates = np.flatnonzero(hit)
+        candidates = candidates[np.argsort(projection[candidates], kind="stable")]
+        hit_enemies = self.select_enemies(candidates)
+        return hit_enemies[0] if hit_enemies else None
     
     def get_visible_enemies(self, player):
         """Get enemies visible to the player."""
-        visible_enemies = []
-        
-        for enemy in self.enemies:
-            if enemy.state == "DEAD":
-                continue
-            
-            # Calculate distance
-            distance = np.sqrt((enemy.x - player.x)**2 + (enemy.y - player.y)**2)
-            
-            if distance <= MAX_RENDER_DISTANCE:
-                visible_enemies.append(enemy)
-        
-        return visible_enemies
+        return self.get_enemies_in_area(player.x, player.y, MAX_RENDER_DISTANCE)
     
     def spawn_enemy(self, x, y, enemy_type):
         """Spawn a new enemy at the specified location."""
         if self.world.is_passable(x, y):
             enemy = Enemy(x, y, enemy_type, f"{enemy_type}_sprite")
             self.enemies.append(enemy)
+            self.sync_arrays()
             return enemy
         return None
     
@@ -445,24 +473,23 @@ class EnemyManager:
         """Remove an enemy from the game."""
         if enemy in self.enemies:
             self.enemies.remove(enemy)
+            enemy.manager = None
+            self.sync_arrays()
     
     def get_enemies_in_area(self, center_x, center_y, radius):
         """Get all enemies within a specified area."""
-        enemies_in_area = []
-        
-        for enemy in self.enemies:
-            if enemy.state == "DEAD":
-                continue
-            
-            distance = np.sqrt((enemy.x - center_x)**2 + (enemy.y - center_y)**2)
-            if distance <= radius:
-                enemies_in_area.append(enemy)
-        
-        return enemies_in_area
+        dx = self.xs - center_x
+        dy = self.ys - center_y
+        in_area = self.alive & (dx * dx + dy * dy <= radius * radius)
+        return self.select_enemies(np.flatnonzero(in_area))
     
     def clear_dead_enemies(self):
         """Remove all dead enemies from the game."""
+        for enemy in self.enemies:
+            if enemy.state == "DEAD":
+                enemy.manager = None
         self.enemies = [enemy for enemy in self.enemies if enemy.state != "DEAD"]
+        self.sync_arrays()
     
     def to_dict(self):
         """Convert enemy manager state to dictionary for saving."""
@@ -472,9 +499,12 @@ class EnemyManager:
     
     def from_dict(self, data):
         """Load enemy manager state from dictionary."""
+        for enemy in self.enemies:
+            enemy.manager = None
         self.enemies.clear()
         
         for enemy_data in data.get('enemies', []):
             enemy = Enemy(0, 0, 'goblin', 'goblin_sprite')  # Temporary values
             enemy.from_dict(enemy_data)
             self.enemies.append(enemy)
+        self.sync_arrays()
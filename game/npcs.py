@@ -355,10 +355,12 @@ class DialogueUI:
         text = self.current_dialogue.get("text", "")
         wrapped_lines = self.wrap_text(text, dialogue_width - 20)
         
+        # Text lines and options are collected and drawn with a single blits() call
+        blit_list = []
         y_offset = 35
         for line in wrapped_lines:
             text_surface = self.font_small.render(line, True, self.text_color)
-            screen.blit(text_surface, (dialogue_x + 10, dialogue_y + y_offset))
+            blit_list.append((text_surface, (dialogue_x + 10, dialogue_y + y_offset)))
             y_offset += 25
         
         # Options
@@ -368,9 +370,11 @@ class DialogueUI:
             for i, (option_text, _) in enumerate(options):
                 color = self.selected_option_color if i == self.selected_option else self.option_color
                 option_surface = self.font_small.render(f"{i+1}. {option_text}", True, color)
-                screen.blit(option_surface, (dialogue_x + 20, dialogue_y + y_offset))
+                blit_list.append((option_surface, (dialogue_x + 20, dialogue_y + y_offset)))
                 y_offset += 25
         
+        screen.blits(blit_list, doreturn=False)
+        
         # Instructions
         instruction = "Use arrows and Enter to select, ESC to close"
         instruction_surface = self.font_small.render(instruction, True, (150, 150, 150))
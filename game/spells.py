@@ -3,6 +3,7 @@ Spell system for the pseudo-3D RPG.
 Handles spell casting, effects, and magical combat.
 """
 
+import random
 import pygame
 import numpy as np
 from config import *
@@ -371,7 +372,7 @@ class SpellSystem:
         spell_level_bonus = spell.level * 2
         
         # Add random variation
-        damage_variation = np.random.uniform(0.9, 1.1)
+        damage_variation = random.uniform(0.9, 1.1)
         
         # Apply intelligence bonus if applicable
         int_bonus = 1.0
@@ -5,6 +5,7 @@ Handles map data, terrain, and world state persistence.
 
 import numpy as np
 import json
+from numba import jit
 from config import *
 
 class World:
@@ -143,6 +144,8 @@ class World:
                 self.add_ramp(x, y, args[0])
             else:
                 self.add_ladder(x, y)
+        
+        self.update_blocked_grid()
     
     def create_maze_section(self, start_x, start_y, width, height):
         """Create a maze-like section for more complex exploration."""
@@ -295,19 +298,32 @@ class World:
         """Set the value of a map cell."""
         if 0 <= x < self.width and 0 <= y < self.height:
             self.map_data[y, x] = value
+            # Only this cell's blocked flag can change
+            closed_door = any(
+                not door['is_open'] and int(door['x']) == x and int(door['y']) == y
+                for door in self.doors
+            )
+            self.blocked_grid[y, x] = value > 0 or closed_door
     
-    def is_passable(self, x, y):
-        """Check if a position is passable."""
-        # Check basic wall collision
-        if self.get_cell(int(x), int(y)) > 0:
-            return False
+    def update_blocked_grid(self):
+        """Rebuild blocked_grid, a [y, x] uint8 array that is 1 at walls and closed doors.
         
-        # Check for closed doors
+        Kept in step by the World methods that change walls or doors; call it
+        after writing map_data or a door's state directly.
+        """
+        blocked = (self.map_data > 0).astype(np.uint8)
         for door in self.doors:
-            if int(door['x']) == int(x) and int(door['y']) == int(y):
-                return door['is_open']
-        
-        return True
+            x, y = int(door['x']), int(door['y'])
+            if not door['is_open'] and 0 <= x < self.width and 0 <= y < self.height:
+                blocked[y, x] = 1
+        self.blocked_grid = blocked
+    
+    def is_passable(self, x, y):
+        """Check if a position is passable (no wall or closed door; outside the map is not)."""
+        x, y = int(x), int(y)
+        if 0 <= x < self.width and 0 <= y < self.height:
+            return not self.blocked_grid[y, x]
+        return False
     
     def is_water(self, x, y):
         """Check if a position is in water."""
@@ -341,11 +357,13 @@ class World:
                     # Check if player has the required key
                     if hasattr(player, 'has_key') and player.has_key(door['type']):
                         door['is_open'] = not door['is_open']
+                        self.update_blocked_grid()
                         return f"Door {door['type']} {'opened' if door['is_open'] else 'closed'}"
                     else:
                         return f"This door requires a key."
                 else:
                     door['is_open'] = not door['is_open']
+                    self.update_blocked_grid()
                     return f"Door {'opened' if door['is_open'] else 'closed'}"
         
         return None
@@ -362,6 +380,7 @@ class World:
                     for door in self.doors:
                         if door['type'] == "secret_door":
                             door['is_open'] = switch['is_activated']
+                    self.update_blocked_grid()
                 
                 return f"Switch {'activated' if switch['is_activated'] else 'deactivated'}"
         
@@ -407,6 +426,7 @@ class World:
                 # Create a simple maze pattern
                 if (x + y) % 3 == 0 and np.random.random() < 0.3:
                     self.map_data[y, x] = np.random.choice([2, 3, 4])
+        self.update_blocked_grid()
     
     def to_dict(self):
         """Convert world state to dictionary for saving."""
@@ -439,3 +459,56 @@ class World:
         self.ladders = data.get('ladders', [])
         self.world_name = data.get('world_name', self.world_name)
         self.visited_cells = set(tuple(cell) for cell in data.get('visited_cells', []))
+        self.update_blocked_grid()
+
+@jit(nopython=True, cache=True)
+def line_of_sight(start_x, start_y, target_x, target_y, blocked_grid):
+    """Check that no blocked cell lies between start and target (outside the map is blocked).
+    
+    blocked_grid is any (y, x) array that is nonzero where the line stops:
+    World.blocked_grid for sight, or the map array for projectiles.
+    
+    Grid traversal (Amanatides-Woo): visits every cell the line crosses
+    exactly once, in order. The start and target cells are not checked.
+    """
+    height, width = blocked_grid.shape
+    dx = target_x - start_x
+    dy = target_y - start_y
+    map_x = int(np.floor(start_x))
+    map_y = int(np.floor(start_y))
+    end_x = int(np.floor(target_x))
+    end_y = int(np.floor(target_y))
+    
+    # Crossings are in units of the whole line, so the target is at t = 1
+    delta_t_x = abs(1.0 / dx) if dx != 0 else 1e30
+    delta_t_y = abs(1.0 / dy) if dy != 0 else 1e30
+    
+    if dx < 0:
+        step_x = -1
+        t_max_x = (start_x - map_x) * delta_t_x
+    else:
+        step_x = 1
+        t_max_x = (map_x + 1.0 - start_x) * delta_t_x
+        
+    if dy < 0:
+        step_y = -1
+        t_max_y = (start_y - map_y) * delta_t_y
+    else:
+        step_y = 1
+        t_max_y = (map_y + 1.0 - start_y) * delta_t_y
+    
+    while min(t_max_x, t_max_y) < 1.0:
+        if t_max_x < t_max_y:
+            t_max_x += delta_t_x
+            map_x += step_x
+        else:
+            t_max_y += delta_t_y
+            map_y += step_y
+        
+        if map_x == end_x and map_y == end_y:
+            continue
+        if (map_x < 0 or map_x >= width or map_y < 0 or map_y >= height or
+            blocked_grid[map_y, map_x]):
+            return False
+    
+    return True
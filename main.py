@@ -24,12 +24,10 @@ from config import *
 class Game:
     def __init__(self):
         """Initialize the game engine and all systems."""
-        pygame.init()
-        try:
-            pygame.mixer.init()
-        except pygame.error:
-            print("Audio device not available, continuing without sound")
-            # Continue without audio
+        # Everything but the mixer: AssetManager.load_sounds opens the audio
+        # device on its own thread, while the textures load
+        pygame.display.init()
+        pygame.font.init()
         
         # Create display
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -51,6 +49,7 @@ class Game:
         
         # Initialize game systems
         self.world = World()
+        self.raycaster.set_world(self.world)
         self.player = Player(self.world.spawn_x, self.world.spawn_y)
         self.combat_system = CombatSystem(self.asset_manager)
         
@@ -449,6 +448,7 @@ class Game:
         if game_data:
             self.player.from_dict(game_data['player'])
             self.world.from_dict(game_data['world'])
+            self.raycaster.set_world(self.world)  # from_dict replaces the map array
             self.enemy_manager.from_dict(game_data['enemies'])
             return True
     
@@ -488,6 +488,7 @@ class Game:
         """Start a completely fresh new game."""
         # Reset all game systems
         self.world = World()
+        self.raycaster.set_world(self.world)
         self.player = Player(self.world.spawn_x, self.world.spawn_y)
         
         # Give player default equipment
@@ -555,6 +556,13 @@ class Game:
             # Handle events
             self.handle_events()
             
+            # Stream textures in behind the menu; gameplay needs all of them
+            if not self.asset_manager.ready:
+                if self.game_state == "MAIN_MENU":
+                    self.asset_manager.pump_assets()
+                else:
+                    self.asset_manager.wait_for_assets()
+            
             # Update game state
             self.update()
             
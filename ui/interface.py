@@ -572,10 +572,13 @@ class GameUI:
             f"Angle: {np.degrees(player.angle):.1f}°"
         ]
         
+        # Batch all stat lines into a single blits() call
+        blit_list = []
         for i, stat in enumerate(stats):
             if stat:  # Skip empty lines for spacing
                 stat_surface = self.font_small.render(stat, True, self.text_color)
-                screen.blit(stat_surface, (sheet_x + 20, stats_start_y + i * line_height))
+                blit_list.append((stat_surface, (sheet_x + 20, stats_start_y + i * line_height)))
+        screen.blits(blit_list, doreturn=False)
         
         # Instructions
         instruction_text = "Press C to close"
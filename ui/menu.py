@@ -393,9 +393,12 @@ class MainMenu:
             "Press any key to return to main menu"
         ]
         
+        # Batch all credit lines into a single blits() call
         start_y = 180
+        blit_list = []
         for i, line in enumerate(credits_lines):
             if line:  # Skip empty lines
                 line_surface = self.font_small.render(line, True, self.menu_color)
                 line_rect = line_surface.get_rect(center=(SCREEN_WIDTH // 2, start_y + i * 30))
-                screen.blit(line_surface, line_rect)
+                blit_list.append((line_surface, line_rect))
+        screen.blits(blit_list, doreturn=False)